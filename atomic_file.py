@@ -0,0 +1,21 @@
+import contextlib
+import os
+
+# Every file the pipeline writes for a later run to read (caches, packs,
+# state, ledgers, results, metrics) goes through atomic_open: the data is
+# written to <path>.tmp and only moved over path once the write finished,
+# so a crash or a reader never sees half a file
+
+
+@contextlib.contextmanager
+def atomic_open(path, mode="w"):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, mode) as file:
+            yield file
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    os.replace(tmp, path)
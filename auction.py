@@ -0,0 +1,70 @@
+import csv
+import re
+from collections import namedtuple
+
+from fixture_index import team_short_forms
+
+# fun.csv is the auction sheet: each IPL squad under its full team name,
+# split into role sections, one player per row with the winning bid and
+# the participant who won them (both blank when the player went unsold).
+# Captaincy marks like "(c)" are dropped from names. Columns E to I list
+# each participant's starting budget, what they had left and squad size.
+AUCTION_PATH = "fun.csv"
+ROLES = {
+    "batsmen:": "batsmen",
+    "all-rounders:": "all-rounders",
+    "bowlers:": "bowlers",
+    "wicketkeepers:": "wicketkeepers",
+}
+
+Lot = namedtuple("Lot", ["player", "team", "role", "price", "buyer"])
+Budget = namedtuple("Budget", ["budget", "remaining", "players"])
+
+
+def player_name(text):
+    text = re.sub(r"\s+", " ", text.strip())
+    return re.sub(r"\s*\((?:c|vc)\)$", "", text, flags=re.IGNORECASE)
+
+
+def read_auction(path=AUCTION_PATH):
+    lots = []
+    team, role = None, None
+    with open(path, mode="r", encoding="utf-8-sig", newline="") as file:
+        reader = csv.reader(file)
+        next(reader, None)  # Column headings
+        for line in reader:
+            text = line[0].strip() if line else ""
+            if not text:
+                continue
+            if text in team_short_forms:
+                team, role = team_short_forms[text], None
+            elif text.lower() in ROLES:
+                role = ROLES[text.lower()]
+            else:
+                price = line[1].strip() if len(line) > 1 else ""
+                buyer = line[2].strip() if len(line) > 2 else ""
+                lots.append(
+                    Lot(
+                        player_name(text),
+                        team,
+                        role,
+                        int(price) if price.isdigit() else 0,
+                        buyer or None,
+                    )
+                )
+    return lots
+
+
+def read_budgets(path=AUCTION_PATH):
+    # participant -> Budget, in sheet order
+    budgets = {}
+    with open(path, mode="r", encoding="utf-8-sig", newline="") as file:
+        reader = csv.reader(file)
+        next(reader, None)
+        for line in reader:
+            cells = [cell.strip() for cell in line[4:9]]
+            if len(cells) == 5 and cells[0] and cells[1].isdigit():
+                budgets[cells[0]] = Budget(
+                    int(cells[1]), int(cells[3] or 0), int(cells[4] or 0)
+                )
+    return budgets
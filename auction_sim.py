@@ -0,0 +1,234 @@
+import argparse
+import sqlite3
+import time
+
+import numpy as np
+
+from auction import AUCTION_PATH, read_auction, read_budgets
+from projection import OUTFIELD, best_xi
+from results_db import (
+    BUSY_TIMEOUT,
+    DB_PATH,
+    add_db_argument,
+    load_registry,
+    player_totals,
+    require_db,
+)
+from simulation import add_run_arguments, run
+
+# Re-runs the auction in fun.csv many times with simulated bidders, to see
+# which bidding strategy buys the most season points. Each simulated
+# auction puts the sheet's players up in a random order. Every participant
+# keeps their real budget and is dealt one of STRATEGIES, which values a
+# player from their season points in the results database, give or take
+# NOISE. Sheet names are matched to scored players by results_db's
+# registry: every name scoring met a player under, utils/aliases.csv and,
+# failing those, the name in any case.
+# The highest bid wins if the bidder can still afford to fill the smallest
+# real squad, paying the second-highest bid (MIN_BID if unopposed); squads
+# stop at the largest real squad. A squad is worth the season points of
+# its Best XI, picked by the players' auction roles the way get_best_xi
+# picks it. Auctions run as NumPy arrays in batches of BATCH, one lot at a
+# time across the whole batch, spread over a process pool.
+MIN_BID = 5
+BATCH = 2048
+NOISE = 0.25  # Bids land uniformly within this share of a valuation
+STAR_SHARE = 0.1  # "stars" pay double for this top share of the pool
+STRATEGIES = ["value", "stars", "balanced", "random"]
+# Auction roles in best_xi's argument order; a player outside every role
+# section can fill any place, like an all-rounder
+ROLES = ["wicketkeepers", "batsmen", "bowlers", "all-rounders"]
+
+
+class Market:
+    # Everything a simulated auction needs, as plain arrays
+    def __init__(self, points, roles, budgets, min_squad, max_squad):
+        order = np.argsort(-np.asarray(points, dtype=float), kind="stable")
+        self.points = np.asarray(points, dtype=float)[order]
+        self.roles = np.asarray(roles, dtype=np.intp)[order]  # Indices into ROLES
+        self.budgets = np.asarray(budgets, dtype=float)  # Per participant
+        self.min_squad = min_squad
+        self.max_squad = max_squad
+        # Money per point if the room's budgets bought the best players
+        # it has squad slots for
+        best = self.points[: len(self.budgets) * max_squad]
+        self.mean_points = max(best.mean(), 1.0)
+        self.unit = self.budgets.sum() / max(best.sum(), 1.0)
+        self.star_points = np.quantile(self.points, 1 - STAR_SHARE)
+
+
+def squad_points(roster, roles):
+    # Best XI points of each squad, from the (participants, sims, max squad)
+    # points and ROLES indices of the players each bought (-1 for a slot
+    # left empty)
+    participants, sims, slots = roster.shape
+    pools = []
+    for role in range(len(ROLES)):
+        pool = np.full((participants, max(slots, OUTFIELD), sims), np.nan)
+        pool[:, :slots] = np.where(roles == role, roster, np.nan).transpose(0, 2, 1)
+        pools.append(pool)
+    return best_xi(*pools)
+
+
+def simulate_batch(market, sims, rng):
+    # One batch of auctions; returns each bidder's strategy, squad points,
+    # spend and squad size, all (participants, sims). Arrays are laid out
+    # participants first so per-lot reductions run over contiguous rows.
+    # Only the winner's budget, squad and bid cap change with each lot, so
+    # those are updated in place rather than recomputed for every bidder
+    participants = len(market.budgets)
+    lots = len(market.points)
+    strategy = rng.integers(len(STRATEGIES), size=(participants, sims))
+    value, stars, balanced, randomly = (
+        (strategy == s).astype(float) for s in range(len(STRATEGIES))
+    )
+    order = np.argsort(rng.random((sims, lots)), axis=1).T
+    noise = rng.random((lots, participants, sims))
+    random_bids = randomly * noise * (2 * market.unit * market.mean_points)
+    noise *= 2 * NOISE
+    noise += 1 - NOISE
+    # A tiny per-bidder offset on the cap settles ties between capped bids
+    tie_break = rng.random((participants, sims)) * 1e-6
+
+    budget = np.repeat(market.budgets[:, None], sims, axis=1)
+    squad = np.zeros((participants, sims))
+    per_slot = budget / market.max_squad  # What "balanced" can spend a player
+    # Most a bidder can pay while keeping MIN_BID back for each player still
+    # needed to reach the smallest squad; 0 once the squad is full
+    cap = budget - MIN_BID * max(market.min_squad - 1, 0) + tie_break
+    roster = np.zeros((participants, sims, market.max_squad))
+    roster_roles = np.full((participants, sims, market.max_squad), -1)
+    columns = np.arange(sims)
+
+    for t in range(lots):
+        lot = order[t]
+        x = market.points[lot]
+        stars_pay = np.where(x >= market.star_points, 2.0, 0.5)
+        bids = (stars * stars_pay + value) * (market.unit * x)
+        bids += balanced * per_slot * (x / market.mean_points)
+        bids *= noise[t]
+        bids += random_bids[t]
+        np.minimum(bids, cap, out=bids)
+        bids *= bids >= MIN_BID
+
+        winner = bids.argmax(axis=0)
+        first = bids[winner, columns]
+        bids[winner, columns] = 0
+        second = bids.max(axis=0)
+        sold = first >= MIN_BID
+        won = winner[sold], columns[sold]
+        budget[won] -= np.maximum(np.floor(second[sold]), MIN_BID)
+        slot = won + (squad[won].astype(int),)
+        roster[slot] = x[sold]
+        roster_roles[slot] = market.roles[lot][sold]
+        squad[won] += 1
+        left = market.max_squad - squad[won]
+        per_slot[won] = budget[won] / np.maximum(left, 1)
+        cap[won] = np.where(
+            left > 0,
+            budget[won]
+            - MIN_BID * np.maximum(market.min_squad - squad[won] - 1, 0)
+            + tie_break[won],
+            0,
+        )
+
+    return (
+        strategy,
+        squad_points(roster, roster_roles),
+        market.budgets[:, None] - budget,
+        squad,
+    )
+
+
+def simulate(market, sims, seed=None):
+    # Per strategy: [bidders, sum and sum of squares of squad points,
+    # total spend, total squad size]
+    rng = np.random.default_rng(seed)
+    stats = np.zeros((len(STRATEGIES), 5))
+    for start in range(0, sims, BATCH):
+        strategy, points, spent, squad = simulate_batch(
+            market, min(BATCH, sims - start), rng
+        )
+        for s in range(len(STRATEGIES)):
+            mine = strategy == s
+            stats[s] += [
+                mine.sum(),
+                points[mine].sum(),
+                (points[mine] ** 2).sum(),
+                spent[mine].sum(),
+                squad[mine].sum(),
+            ]
+    return stats
+
+
+def load_market(auction_path=AUCTION_PATH, db_path=DB_PATH, folder="."):
+    # The market fun.csv describes, priced with season points from the
+    # results database, and the auction as it actually went
+    lots = read_auction(auction_path)
+    budgets = read_budgets(auction_path)
+    db = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT)
+    registry = load_registry(db, folder)
+    totals = {registry.find(p): v for p, v in player_totals(db).items()}
+    db.close()
+    points = [totals.get(registry.find(lot.player), 0) for lot in lots]
+    roles = [
+        ROLES.index(lot.role if lot.role in ROLES else "all-rounders") for lot in lots
+    ]
+    sizes = [b.players for b in budgets.values()]
+    market = Market(
+        points, roles, [b.budget for b in budgets.values()], min(sizes), max(sizes)
+    )
+    squads = {buyer: [] for buyer in budgets}
+    for lot, x, role in zip(lots, points, roles):
+        if lot.buyer in squads:
+            squads[lot.buyer].append((x, role))
+    width = max([len(squad) for squad in squads.values()] + [1])
+    roster = np.zeros((len(squads), 1, width))
+    roster_roles = np.full((len(squads), 1, width), -1)
+    for i, squad in enumerate(squads.values()):
+        for j, (x, role) in enumerate(squad):
+            roster[i, 0, j], roster_roles[i, 0, j] = x, role
+    actual = {
+        buyer: round(points)
+        for buyer, points in zip(squads, squad_points(roster, roster_roles)[:, 0])
+    }
+    return market, lots, actual
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sims", type=int, default=20000, help="Auctions simulated (default: 20000)"
+    )
+    add_run_arguments(parser)
+    parser.add_argument(
+        "--auction",
+        type=str,
+        default=AUCTION_PATH,
+        help=f"Auction sheet (default: {AUCTION_PATH})",
+    )
+    add_db_argument(parser)
+    args = parser.parse_args()
+    require_db(parser, args.db)
+    market, lots, actual = load_market(args.auction, args.db)
+    start = time.perf_counter()
+    stats = run(simulate, market, args.sims, jobs=max(1, args.jobs), seed=args.seed)
+    seconds = time.perf_counter() - start
+
+    print(
+        f"{args.sims} auctions, {len(market.budgets)} participants, {len(lots)}"
+        f" players ({np.count_nonzero(market.points)} with points) in {seconds:.2f} s"
+    )
+    print("\nEXPECTED SQUAD POINTS:")
+    for name, (n, total, squares, spent, squad) in zip(STRATEGIES, stats):
+        if not n:
+            continue
+        mean = total / n
+        error = np.sqrt(max(squares / n - mean**2, 0) / n)
+        print(
+            f"{name}: {mean:.1f} ± {error:.1f}"
+            f" (spends {spent / n:.1f}, {squad / n:.1f} players)"
+        )
+    print("\nACTUAL AUCTION:")
+    for buyer, points in sorted(actual.items(), key=lambda item: -item[1]):
+        print(f"{buyer}: {points}")
@@ -0,0 +1,383 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import main
+from leaderboard import Leaderboard
+from main import get_best_xi
+from results_table import CsvExporter
+from score_accumulator import ScoreAccumulator
+from standings_ledger import StandingsLedger
+
+ROLES = ["batsmen", "all-rounders", "bowlers"]
+POSITIONS = {"batsmen": "BA", "all-rounders": "AR", "bowlers": "B"}
+TEAMS = ["MI", "CSK", "RCB", "KKR", "SRH", "RR", "DC", "PBKS", "LSG", "GT"]
+DISMISSALS = ["Bowled", "LBW", "Caught", "Caught & Bowled", "Stumped", "Run out"]
+STAGES = ["compute_innings", "attribution", "best_xi", "output", "end_to_end"]
+FIRST_EVENT = 90000001
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def random_squads(participants, squad_size, seed=0):
+    rng = random.Random(seed)
+    participant_dict = {}
+    for p in range(participants):
+        players = []
+        for i in range(squad_size):
+            name = f"Player {p}-{i}" + (" (WK)" if rng.random() < 0.15 else "")
+            players.append((name, rng.randint(-6, 150), rng.choice(ROLES)))
+        participant_dict[f"Participant {p}"] = players
+    return participant_dict
+
+
+def bench_best_xi(sizes, participants, repeat=3):
+    print("BEST XI:")
+    for squad_size in sizes:
+        participant_dict = random_squads(participants, squad_size)
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            get_best_xi(participant_dict, {})
+            best = min(best, time.perf_counter() - start)
+        per_participant = best / participants * 1e6
+        print(
+            f"{participants} participants x {squad_size} players: "
+            f"{best * 1000:.2f} ms ({per_participant:.1f} us per participant)"
+        )
+
+
+def bench_startup(repeat=5):
+    # Wall time for a fresh interpreter to load main.py, against a bare one
+    print("STARTUP:")
+    for label, code in (("python", "pass"), ("import main", "import main")):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], check=True, cwd=HERE)
+            best = min(best, time.perf_counter() - start)
+        print(f"{label}: {best * 1000:.1f} ms")
+
+
+def random_inning(rng, batting, bowling, squads, players):
+    bowlers = rng.sample(squads[bowling], min(5, len(squads[bowling])))
+    lines, wickets = [], 0
+    for name in squads[batting][:players]:
+        balls = rng.randint(0, 50)
+        runs = max(0, int(balls * rng.uniform(0.5, 2.2)))
+        out = wickets < 10 and rng.random() < 0.7
+        wickets += out
+        line = {
+            "player": {"name": name, "position": squads["position"][name]},
+            "score": runs,
+            "balls": balls,
+            "s4": runs // 12,
+            "s6": runs // 20,
+            "wicketTypeName": rng.choice(DISMISSALS) if out else "Not out",
+        }
+        if out:
+            line["wicketBowlerName"] = rng.choice(bowlers)
+            line["wicketCatchName"] = rng.choice(squads[bowling])
+        lines.append(line)
+    return {
+        "battingTeam": {"shortName": batting},
+        "bowlingTeam": {"shortName": bowling},
+        "score": sum(line["score"] for line in lines),
+        "wickets": wickets,
+        "overs": 20,
+        "bowlingLine": [
+            {
+                "player": {"name": name, "position": squads["position"][name]},
+                "over": 4,
+                "maiden": int(rng.random() < 0.1),
+                "run": rng.randint(15, 55),
+                "wicket": rng.randint(0, 3),
+            }
+            for name in bowlers
+        ],
+        "battingLine": lines,
+    }
+
+
+def generate_season(
+    folder, events=74, games=15, players=11, participants=8, roster_size=16, seed=0
+):
+    # A synthetic season in the data/, ids/ and teams/ layouts main.py reads:
+    # `events` finished matches split over `games` games (one gameweek each),
+    # `players` batting lines per innings and `participants` rosters of
+    # `roster_size` players
+    rng = random.Random(seed)
+    # Squads grow with the league so every roster can be filled
+    squad_size = max(players, 11, -(-participants * roster_size // len(TEAMS)))
+    squads = {"position": {}}
+    for team in TEAMS:
+        squads[team] = []
+        for i in range(squad_size):
+            name = f"{team} Player {i}"
+            squads[team].append(name)
+            squads["position"][name] = POSITIONS[ROLES[i * 3 // squad_size]]
+    pool = [name for team in TEAMS for name in squads[team]]
+
+    for sub in ("data", "ids", "teams", "points", "calcSheets"):
+        os.makedirs(f"{folder}/{sub}", exist_ok=True)
+    per_game = -(-events // games)
+    for game in range(1, games + 1):
+        with open(f"{folder}/ids/game{game}ids.csv", "w") as file:
+            for n in range((game - 1) * per_game, min(game * per_game, events)):
+                event_id = FIRST_EVENT + n
+                home, away = rng.sample(TEAMS, 2)
+                innings = [
+                    random_inning(rng, home, away, squads, players),
+                    random_inning(rng, away, home, squads, players),
+                ]
+                with open(f"{folder}/data/{event_id}.json", "w") as data:
+                    json.dump({"innings": innings}, data)
+                file.write(f"{event_id},{game}\n")
+
+        with open(f"{folder}/teams/gw{game}teams.csv", "w") as file:
+            owned = rng.sample(pool, min(participants * roster_size, len(pool)))
+            for p in range(participants):
+                squad = owned[p * roster_size : (p + 1) * roster_size]
+                file.write(f"*Participant {p}\n")
+                for role in ROLES:
+                    file.write(f"{role.capitalize()}\n")
+                    for name in squad:
+                        if squads["position"][name] == POSITIONS[role]:
+                            wk = role == "batsmen" and rng.random() < 0.3
+                            file.write(f"{name}{' (WK)' if wk else ''}\n")
+                    file.write("\n")
+    return list(range(1, games + 1))
+
+
+def best_of(repeat, run):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_season(games, repeat=3):
+    # Time each pipeline stage in isolation over every game, then whole
+    # main() runs. Call from inside the season folder
+    main.OFFLINE = True
+    inputs = {}
+    for game in games:
+        event_ids = main.read_event_ids(game)
+        inputs[game] = (event_ids, main.load_payloads(event_ids))
+
+    def compute_innings():
+        for event_ids, payloads in inputs.values():
+            score_dict = ScoreAccumulator()
+            for event_id, e_dict in event_ids.items():
+                main.get_data(
+                    event_id, score_dict, e_dict["team_choice"], payloads[event_id]
+                )
+
+    # Scores after every event, so attribution can be replayed on its own
+    folds = {}
+    for game, (event_ids, payloads) in inputs.items():
+        score_dict, folds[game] = ScoreAccumulator(), []
+        for event_id, e_dict in event_ids.items():
+            main.get_data(
+                event_id, score_dict, e_dict["team_choice"], payloads[event_id]
+            )
+            folds[game].append((score_dict.copy(), e_dict["gw_no"]))
+            score_dict.end_event(e_dict["gw_no"])
+
+    squads = {}
+
+    def attribution():
+        for game, fold in folds.items():
+            participant_dict = {}
+            for score_dict, gw_no in fold:
+                score_dict = score_dict.copy()
+                main.attribute_event(score_dict, gw_no, participant_dict)
+            squads[game] = (participant_dict, score_dict, gw_no)
+
+    attribution()
+    best_xis = {}
+
+    def best_xi():
+        for game, (participant_dict, _, _) in squads.items():
+            best_xis[game] = {}
+            get_best_xi(participant_dict, best_xis[game])
+
+    best_xi()
+    missing = {
+        game: main.find_missing(gw_no, score_dict)
+        for game, (_, score_dict, gw_no) in squads.items()
+    }
+
+    def output():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for game, best_xi_dict in best_xis.items():
+                players = main.REGISTRY.named(squads[game][1].ranked())
+                results = main.output_participant_points(
+                    best_xi_dict, missing[game], game, players
+                )
+                CsvExporter().export(results)
+
+    def end_to_end():
+        main.roster_cache.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for game in games:
+                main.main(
+                    None,
+                    game,
+                    Leaderboard(),
+                    update_sheet=False,
+                    payloads=inputs[game][1],
+                    ledger=StandingsLedger(None),
+                )
+
+    stages = {
+        "compute_innings": compute_innings,
+        "attribution": attribution,
+        "best_xi": best_xi,
+        "output": output,
+        "end_to_end": end_to_end,
+    }
+    return {name: best_of(repeat, stages[name]) for name in STAGES}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=HERE,
+        ).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(results, baseline, tolerance):
+    # Stages more than `tolerance` slower than the baseline run
+    slower = []
+    for name in STAGES:
+        before = baseline["stages"].get(name)
+        if before:
+            ratio = results["stages"][name] / before
+            print(f"{name}: {ratio:.2f}x baseline")
+            if ratio > 1 + tolerance:
+                slower.append(name)
+    return slower
+
+
+def run_season(args):
+    params = {
+        "events": args.events,
+        "games": args.games,
+        "players": args.players,
+        "participants": args.participants,
+        "roster_size": args.roster_size,
+    }
+    here = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = args.keep or tmp
+        games = generate_season(folder, **params)
+        os.chdir(folder)
+        try:
+            stages = bench_season(games, repeat=args.repeat)
+        finally:
+            os.chdir(here)
+
+    print("SEASON:")
+    for name in STAGES:
+        print(f"{name}: {stages[name] * 1000:.2f} ms")
+    results = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "params": params,
+        "stages": stages,
+    }
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=1)
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline["params"] != params:
+            print("Baseline was recorded with different parameters")
+        slower = compare(results, baseline, args.tolerance)
+        if slower:
+            print(f"Slower than baseline: {', '.join(slower)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("startup", help="Interpreter and import time")
+    best_xi_parser = commands.add_parser("best-xi", help="Best XI selection")
+    best_xi_parser.add_argument(
+        "--sizes",
+        type=str,
+        default="16,50,200,1000",
+        help="Comma separated squad sizes (default: 16,50,200,1000)",
+    )
+    best_xi_parser.add_argument(
+        "--participants",
+        type=int,
+        default=500,
+        help="Participants per run (default: 500)",
+    )
+    season_parser = commands.add_parser(
+        "season", help="Scoring pipeline on a synthetic season"
+    )
+    season_parser.add_argument(
+        "--events", type=int, default=74, help="Matches (default: 74)"
+    )
+    season_parser.add_argument(
+        "--games", type=int, default=15, help="Games (default: 15)"
+    )
+    season_parser.add_argument(
+        "--players", type=int, default=11, help="Batters per innings (default: 11)"
+    )
+    season_parser.add_argument(
+        "--participants", type=int, default=8, help="Participants (default: 8)"
+    )
+    season_parser.add_argument(
+        "--roster-size", type=int, default=16, help="Players per roster (default: 16)"
+    )
+    season_parser.add_argument(
+        "--repeat", type=int, default=5, help="Runs per stage, best kept (default: 5)"
+    )
+    season_parser.add_argument(
+        "--keep", type=str, default=None, help="Write the season here and keep it"
+    )
+    season_parser.add_argument(
+        "--save", type=str, default=None, help="Write results as JSON to this file"
+    )
+    season_parser.add_argument(
+        "--baseline",
+        type=str,
+        default=None,
+        help="Compare against saved results, exiting 1 on a regression",
+    )
+    season_parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown against --baseline (default: 0.25)",
+    )
+    args = parser.parse_args()
+    if args.command in (None, "startup"):
+        bench_startup()
+    if args.command in (None, "best-xi"):
+        bench_best_xi(
+            [int(n) for n in getattr(args, "sizes", "16,50,200,1000").split(",")],
+            getattr(args, "participants", 500),
+        )
+    if args.command in (None, "season"):
+        run_season(args if args.command else season_parser.parse_args([]))
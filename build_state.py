@@ -0,0 +1,109 @@
+import ast
+import hashlib
+import json
+import os
+
+from atomic_file import atomic_open
+from player_registry import ALIASES_PATH
+
+# Per-game record of the inputs the last build used, what it produced and
+# whether the Sheet has it yet, so `--game all` only recomputes games whose
+# inputs changed, and runs without Sheets still count as builds
+STATE_PATH = "build/state.json"
+ENTRY = "main.py"  # Scoring runs start here; code_files follows its imports
+
+code_hashes = {}  # Folder -> hash of its code, worked out once per run
+
+
+def hash_bytes(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def hash_file(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as file:
+        return hash_bytes(file.read())
+
+
+def hash_payload(payload):
+    return hash_bytes(json.dumps(payload, sort_keys=True).encode("utf-8"))
+
+
+def code_files(here, entry=ENTRY):
+    # entry and every module of this folder it imports, directly or through
+    # another, including the imports made inside functions
+    found, pending = [], [entry]
+    while pending:
+        name = pending.pop()
+        if name in found:
+            continue
+        found.append(name)
+        with open(os.path.join(here, name), "rb") as file:
+            tree = ast.parse(file.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and not node.level:
+                modules = [node.module]
+            else:
+                continue
+            for module in modules:
+                path = f"{module.split('.')[0]}.py"
+                if os.path.exists(os.path.join(here, path)):
+                    pending.append(path)
+    return sorted(found)
+
+
+def code_hash():
+    here = os.path.dirname(os.path.abspath(__file__))
+    if here not in code_hashes:
+        code_hashes[here] = hash_bytes(
+            "".join(
+                hash_file(os.path.join(here, f)) or "" for f in code_files(here)
+            ).encode()
+        )
+    return code_hashes[here]
+
+
+def game_inputs(game, event_ids, payloads, folder="."):
+    events = {}
+    for event_id, e_dict in event_ids.items():
+        if e_dict["team_choice"] == "avg":
+            events[event_id] = hash_file(f"data/{event_id}Avg.csv")
+        else:
+            events[event_id] = hash_payload(payloads.get(event_id))
+    gws = sorted({e_dict["gw_no"] for e_dict in event_ids.values()})
+    return {
+        "ids": hash_payload(event_ids),
+        "teams": {gw: hash_file(f"{folder}/teams/gw{gw}teams.csv") for gw in gws},
+        "aliases": hash_file(f"{folder}/{ALIASES_PATH}"),
+        "events": events,
+        "code": code_hash(),
+    }
+
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+def save_state(state, path=STATE_PATH):
+    with atomic_open(path) as file:
+        json.dump(state, file)
+
+
+def cached_result(state, game, inputs, exporters, published=False):
+    # A game is clean when nothing it read changed, every exporter's output
+    # for it still exists and, when `published` is asked for, its sheet has
+    # been written since it was last built
+    entry = state.get(str(game))
+    if entry is None or entry["inputs"] != inputs:
+        return None
+    if not all(exporter.exported(game) for exporter in exporters):
+        return None
+    if published and not entry.get("published"):
+        return None
+    return entry
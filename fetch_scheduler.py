@@ -0,0 +1,212 @@
+import contextlib
+import random
+import threading
+import time
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import httpx
+
+from metrics import METRICS
+
+# Every request to a host goes through that host's token bucket and circuit
+# breaker, both shared by all clients of the run. A request is retried on
+# transport errors, bodies that fail to decode, 429 and 5xx with
+# exponential backoff and full jitter (or the server's Retry-After, in
+# seconds or as an HTTP date); 403 means we are being blocked, so it is
+# not retried and counts against the breaker. Once BREAKER_THRESHOLD
+# attempts in a row have failed the breaker opens and requests fail fast
+# for BREAKER_COOLDOWN seconds, then a single trial request decides whether
+# it closes again. Callers fall back to their local copy on FetchFailed or
+# on any status they cannot use.
+RATE_LIMIT = 4  # Requests per second per host
+BURST = 8
+MAX_RETRIES = 4
+BACKOFF = 0.5  # Seconds before the first retry, doubling after that
+MAX_BACKOFF = 30
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 60
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BLOCKED_STATUSES = {403}
+# Raised by httpx when a request fails; DecodingError is not a
+# TransportError but is just as much a failed fetch
+FETCH_ERRORS = (httpx.TransportError, httpx.DecodingError)
+
+
+class FetchFailed(Exception):
+    def __init__(self, url, reason, status=None):
+        super().__init__(f"{url}: {reason}")
+        self.status = status
+
+
+class TokenBucket:
+    def __init__(self, rate=RATE_LIMIT, burst=BURST, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = burst
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        # Take a token, returning how long to wait before it may be used
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            return 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        threshold=BREAKER_THRESHOLD,
+        cooldown=BREAKER_COOLDOWN,
+        clock=time.monotonic,
+    ):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False  # A half-open trial request is in flight
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.trial or self.clock() - self.opened_at < self.cooldown:
+                return False
+            self.trial = True
+            return True
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial or self.failures >= self.threshold:
+                if self.opened_at is None or self.trial:
+                    METRICS.count("breaker_opened")
+                self.opened_at = self.clock()
+                self.trial = False
+
+
+# host -> (TokenBucket, CircuitBreaker)
+hosts = {}
+hosts_lock = threading.Lock()
+
+
+def host_state(url):
+    host = urlsplit(url).netloc
+    with hosts_lock:
+        if host not in hosts:
+            hosts[host] = (TokenBucket(), CircuitBreaker())
+        return hosts[host]
+
+
+def retry_after(response, now=None):
+    value = response.headers.get("Retry-After") if response is not None else None
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return min(int(value), MAX_BACKOFF)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:  # "-0000": UTC with no zone given
+        when = when.replace(tzinfo=timezone.utc)
+    now = time.time() if now is None else now
+    return min(max(when.timestamp() - now, 0), MAX_BACKOFF)
+
+
+class FetchScheduler:
+    # Wraps an httpx client; get() and stream() hand back the first usable
+    # response, or the last one once retries run out
+    def __init__(self, client, retries=MAX_RETRIES, sleep=time.sleep, rng=random):
+        self.client = client
+        self.retries = retries
+        self.sleep = sleep
+        self.rng = rng
+
+    def backoff(self, attempt, response=None):
+        delay = retry_after(response)
+        if delay is None:
+            delay = self.rng.uniform(0, min(MAX_BACKOFF, BACKOFF * 2**attempt))
+        METRICS.count("fetch_retries")
+        METRICS.add_time("fetch_backoff", delay)
+        self.sleep(delay)
+
+    def attempts(self, url):
+        # Yields attempt numbers while the host will take another request
+        bucket, breaker = host_state(url)
+        for attempt in range(self.retries + 1):
+            if not breaker.allow():
+                raise FetchFailed(url, "circuit open")
+            wait = bucket.reserve()
+            if wait > 0:
+                METRICS.add_time("rate_limit_wait", wait)
+                self.sleep(wait)
+            yield attempt, breaker
+
+    def settle(self, url, breaker, attempt, response):
+        # True when the response is final, False when it is worth retrying
+        status = response.status_code
+        if status in RETRY_STATUSES or status in BLOCKED_STATUSES:
+            breaker.failure()
+        else:
+            breaker.success()
+        if status not in RETRY_STATUSES or attempt == self.retries:
+            return True
+        self.backoff(attempt, response)
+        return False
+
+    def get(self, url, headers=None):
+        for attempt, breaker in self.attempts(url):
+            try:
+                response = self.client.get(url, headers=headers)
+            except FETCH_ERRORS as error:
+                breaker.failure()
+                if attempt == self.retries:
+                    raise FetchFailed(url, error) from error
+                self.backoff(attempt)
+                continue
+            if self.settle(url, breaker, attempt, response):
+                return response
+
+    @contextlib.contextmanager
+    def stream(self, url, headers=None):
+        # Retries only happen before the body is read; errors while it is
+        # being read surface as FetchFailed
+        for attempt, breaker in self.attempts(url):
+            with contextlib.ExitStack() as stack:
+                try:
+                    response = stack.enter_context(
+                        self.client.stream("GET", url, headers=headers)
+                    )
+                except FETCH_ERRORS as error:
+                    breaker.failure()
+                    if attempt == self.retries:
+                        raise FetchFailed(url, error) from error
+                    self.backoff(attempt)
+                    continue
+                if not self.settle(url, breaker, attempt, response):
+                    continue
+                try:
+                    yield response
+                except FETCH_ERRORS as error:
+                    breaker.failure()
+                    raise FetchFailed(url, error) from error
+                return
@@ -0,0 +1,216 @@
+import csv
+import json
+import os
+from datetime import date
+
+from atomic_file import atomic_open
+
+# Which events make up each game, built once from utils/schedule.csv and
+# kept in utils/fixtures.json. utils/season.json says where the season's
+# SofaScore ids start, which ids in the run are not league matches and the
+# day gameweek 1 starts (the first scheduled match by default). The
+# schedule gives every event its gameweek, teams and each team's game
+# number, and from those the default games: a
+# match belongs to the game both teams are on, or to each team's own game
+# (scoring just that team) when their counts differ. An ids/game{n}ids.csv
+# file, hand-edited for washed-out or moved matches, replaces game n
+# wholesale. The index is rebuilt whenever one of its sources changes.
+FIXTURES_PATH = "utils/fixtures.json"
+SCHEDULE_PATH = "utils/schedule.csv"
+SEASON_PATH = "utils/season.json"
+OVERRIDES_FOLDER = "ids"
+VERSION = 1
+
+team_short_forms = {
+    "Mumbai Indians": "MI",
+    "Chennai Super Kings": "CSK",
+    "Royal Challengers Bengaluru": "RCB",
+    "Kolkata Knight Riders": "KKR",
+    "Sunrisers Hyderabad": "SRH",
+    "Rajasthan Royals": "RR",
+    "Delhi Capitals": "DC",
+    "Punjab Kings": "PBKS",
+    "Lucknow Super Giants": "LSG",
+    "Gujarat Titans": "GT",
+}
+
+# Loaded indexes, keyed by folder
+index_cache = {}
+
+
+def read_season(path):
+    # first_event_id (SofaScore id of match 1), skipped_event_ids and
+    # season_start as a date, or None to start from the first match
+    with open(path, "r") as file:
+        season = json.load(file)
+    start = season.get("season_start")
+    return {
+        "first_event_id": int(season["first_event_id"]),
+        "skipped_event_ids": {int(e) for e in season.get("skipped_event_ids", [])},
+        "season_start": date.fromisoformat(start) if start else None,
+    }
+
+
+def schedule_events(path, season):
+    # event id -> week, teams and each team's game number, in schedule order
+    events = {}
+    team_count = {}
+    base = season["first_event_id"]
+    skipped = season["skipped_event_ids"]
+    start = season["season_start"]
+    with open(path, mode="r") as file:
+        for line in csv.reader(file):
+            event_id = base + int(line[0]) - 1
+            while event_id in skipped:
+                base += 1
+                event_id += 1
+            day = date.fromisoformat(line[2].strip())
+            start = start or day
+            week = (day - start).days // 7 + 1
+            teams = [
+                team_short_forms[line[5].strip()],
+                team_short_forms[line[6].strip()],
+            ]
+            for team in teams:
+                team_count[team] = team_count.get(team, 0) + 1
+            events[str(event_id)] = {
+                "week": week,
+                "teams": teams,
+                "games": {team: team_count[team] for team in teams},
+            }
+    return events
+
+
+def schedule_games(events):
+    # game -> [event id, gameweek, team choice] rows
+    games = {}
+    for event_id, event in events.items():
+        (t1, n1), (t2, n2) = event["games"].items()
+        if n1 == n2:
+            games.setdefault(n1, []).append([event_id, str(event["week"]), "B"])
+        else:
+            games.setdefault(n1, []).append([event_id, str(event["week"]), t1])
+            games.setdefault(n2, []).append([event_id, str(event["week"]), t2])
+    return games
+
+
+def read_override(path):
+    # "event id,gameweek[,team choice]  # comment" per line
+    with open(path, mode="r") as file:
+        rows = []
+        for line in csv.reader(line.split("#")[0].strip() for line in file):
+            if line:
+                rows.append(
+                    [
+                        line[0],
+                        line[1].strip(),
+                        line[2].strip() if len(line) > 2 else "B",
+                    ]
+                )
+    return rows
+
+
+def override_files(folder):
+    overrides = {}
+    path = f"{folder}/{OVERRIDES_FOLDER}"
+    if os.path.isdir(path):
+        for file_name in os.listdir(path):
+            number = file_name.removeprefix("game").removesuffix("ids.csv")
+            if number.isdigit():
+                overrides[int(number)] = f"{path}/{file_name}"
+    return overrides
+
+
+def sources(folder):
+    # Every file the index is built from, with the size and mtime it had
+    paths = [f"{folder}/{SCHEDULE_PATH}", f"{folder}/{SEASON_PATH}"] + [
+        path for _, path in sorted(override_files(folder).items())
+    ]
+    signature = {}
+    for path in paths:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            signature[os.path.relpath(path, folder)] = [stat.st_size, stat.st_mtime_ns]
+    return signature
+
+
+class FixtureIndex:
+    def __init__(self, events, games, signature=None):
+        self.events = events  # event id -> week, teams, team game numbers
+        self.games = games  # game -> [event id, gameweek, team choice] rows
+        self.signature = signature or {}
+
+    @classmethod
+    def build(cls, folder="."):
+        schedule = f"{folder}/{SCHEDULE_PATH}"
+        events = {}
+        if os.path.exists(schedule):
+            events = schedule_events(schedule, read_season(f"{folder}/{SEASON_PATH}"))
+        games = schedule_games(events)
+        for game, path in override_files(folder).items():
+            games[game] = read_override(path)
+        return cls(events, dict(sorted(games.items())), sources(folder))
+
+    @classmethod
+    def read(cls, path):
+        with open(path, "r") as file:
+            saved = json.load(file)
+        if saved.get("version") != VERSION:
+            return None
+        games = {int(game): rows for game, rows in saved["games"].items()}
+        return cls(saved["events"], games, saved["sources"])
+
+    def save(self, path):
+        with atomic_open(path) as file:
+            json.dump(
+                {
+                    "version": VERSION,
+                    "sources": self.signature,
+                    "events": self.events,
+                    "games": {str(game): rows for game, rows in self.games.items()},
+                },
+                file,
+                separators=(",", ":"),
+            )
+
+    def game(self, game):
+        # event id -> gameweek and team choice, in processing order
+        return {
+            event_id: {"gw_no": gw_no, "team_choice": team_choice}
+            for event_id, gw_no, team_choice in self.games.get(game, [])
+        }
+
+    def game_numbers(self):
+        return list(self.games)
+
+    def gameweek(self, week):
+        return [e for e, event in self.events.items() if event["week"] == week]
+
+    def team(self, team):
+        return [e for e, event in self.events.items() if team in event["teams"]]
+
+    def week_counts(self):
+        # gameweek -> matches per team
+        counts = {}
+        for event in self.events.values():
+            week = counts.setdefault(event["week"], {})
+            for team in event["teams"]:
+                week[team] = week.get(team, 0) + 1
+        return counts
+
+
+def load_fixtures(folder="."):
+    # The saved index while its sources are unchanged, otherwise a fresh
+    # build written back for the next run
+    signature = sources(folder)
+    key = os.path.abspath(folder)
+    index = index_cache.get(key)
+    if index is not None and index.signature == signature:
+        return index
+    path = f"{folder}/{FIXTURES_PATH}"
+    index = FixtureIndex.read(path) if os.path.exists(path) else None
+    if index is None or index.signature != signature:
+        index = FixtureIndex.build(folder)
+        index.save(path)
+    index_cache[key] = index
+    return index
@@ -0,0 +1,176 @@
+import json
+
+# Records are (kind, value) pairs, always in the order compute_innings works:
+#   ("inning", (batting team, bowling team)), then every ("bowler", line),
+#   then every ("batsman", line) of that inning
+PLAYER_KEYS = {"name", "position", "id"}
+DISMISSAL_KEYS = {"wicketBowler", "wicketCatch"}  # Only their id; names are flat
+LINE_KEYS = {
+    "bowlingLine": {"over", "maiden", "run", "wicket"},
+    "battingLine": {
+        "score",
+        "balls",
+        "s4",
+        "s6",
+        "wicketTypeName",
+        "wicketBowlerName",
+        "wicketCatchName",
+    },
+}
+SUMMARY_KEYS = {"score", "wickets", "overs", "superOver"}
+
+
+def build_prefixes():
+    prefixes = {}
+    for line, keys in LINE_KEYS.items():
+        for key in keys:
+            prefixes[f"innings.item.{line}.item.{key}"] = (line, None, key)
+        for key in PLAYER_KEYS:
+            prefixes[f"innings.item.{line}.item.player.{key}"] = (line, "player", key)
+    for nested in DISMISSAL_KEYS:
+        prefixes[f"innings.item.battingLine.item.{nested}.id"] = (
+            "battingLine",
+            nested,
+            "id",
+        )
+    for key in SUMMARY_KEYS:
+        prefixes[f"innings.item.{key}"] = ("summary", None, key)
+    prefixes["innings.item.battingTeam.shortName"] = ("teams", None, 0)
+    prefixes["innings.item.bowlingTeam.shortName"] = ("teams", None, 1)
+    return prefixes
+
+
+PREFIXES = build_prefixes()
+KINDS = {"bowlingLine": "bowler", "battingLine": "batsman"}
+SCALAR_EVENTS = {"string", "number", "boolean", "null"}
+# Small reads keep the parser's working set to a few KB per match
+READ_SIZE = 8192
+
+
+def payload_records(data, summaries=None):
+    for inning in data.get("innings") or []:
+        if summaries is not None:
+            summaries.append({k: inning.get(k, 0) for k in SUMMARY_KEYS})
+        yield "inning", (
+            inning["battingTeam"]["shortName"],
+            inning["bowlingTeam"]["shortName"],
+        )
+        for bowler in inning["bowlingLine"]:
+            yield "bowler", bowler
+        for batsman in inning["battingLine"]:
+            yield "batsman", batsman
+
+
+class InningState:
+    def __init__(self):
+        self.teams = [None, None]
+        self.summary = {}
+        self.announced = False
+        self.bowling_done = False
+        self.held = []
+
+    def ready(self, kind):
+        if not self.announced:
+            return False
+        return kind == "bowler" or self.bowling_done
+
+    def release(self):
+        # Hand back held lines that can now go out, keeping their order
+        held, self.held = self.held, []
+        for kind, line in sorted(held, key=lambda record: record[0] == "batsman"):
+            if self.ready(kind):
+                yield kind, line
+            else:
+                self.held.append((kind, line))
+
+
+def parse_records(file, summaries=None):
+    # Walk innings[*].bowlingLine / battingLine as bytes arrive, building only
+    # the fields scoring reads and skipping every other subtree
+    try:
+        import ijson
+    except ImportError:  # Fall back to materializing the whole document
+        ijson = None
+    if ijson is None:
+        yield from payload_records(json.load(file), summaries)
+        return
+
+    try:
+        events = ijson.parse(file, buf_size=READ_SIZE, use_float=True)
+        yield from walk_records(events, summaries)
+    except ijson.JSONError as error:
+        # Malformed bodies raise ValueError whichever parser reads them
+        raise ValueError(f"Malformed innings payload: {error}") from error
+
+
+def walk_records(events, summaries=None):
+    # ijson parse events -> scoring records
+    inning = line = None
+    for prefix, event, value in events:
+        target = PREFIXES.get(prefix)
+        if target is not None and event in SCALAR_EVENTS:
+            section, nested, key = target
+            if section == "teams":
+                inning.teams[key] = value
+                if not inning.announced and None not in inning.teams:
+                    inning.announced = True
+                    yield "inning", tuple(inning.teams)
+                    yield from inning.release()
+            elif section == "summary":
+                inning.summary[key] = value
+            elif nested:
+                line.setdefault(nested, {})[key] = value
+            else:
+                line[key] = value
+        elif prefix == "innings.item":
+            if event == "start_map":
+                inning = InningState()
+            elif event == "end_map":
+                if not inning.announced:
+                    inning.announced = True
+                    yield "inning", tuple(inning.teams)
+                inning.bowling_done = True
+                yield from inning.release()
+                if summaries is not None:
+                    summaries.append(
+                        {k: inning.summary.get(k, 0) for k in SUMMARY_KEYS}
+                    )
+        elif prefix in (
+            "innings.item.bowlingLine.item",
+            "innings.item.battingLine.item",
+        ):
+            if event == "start_map":
+                line = {"player": {}}
+            elif event == "end_map":
+                kind = KINDS[prefix.split(".")[2]]
+                if inning.ready(kind):
+                    yield kind, line
+                else:
+                    inning.held.append((kind, line))
+        elif prefix == "innings.item.bowlingLine" and event == "end_array":
+            inning.bowling_done = True
+            yield from inning.release()
+
+
+class ChunkReader:
+    # File-like view over an iterator of byte chunks, optionally copying every
+    # chunk to `sink` as it is consumed
+    def __init__(self, chunks, sink=None):
+        self.chunks = iter(chunks)
+        self.sink = sink
+        self.buffer = b""
+        self.size = 0
+
+    def read(self, n=-1):
+        while n < 0 or len(self.buffer) < n:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.size += len(chunk)
+            if self.sink is not None:
+                self.sink.write(chunk)
+            self.buffer += chunk
+        if n < 0:
+            n = len(self.buffer)
+        data, self.buffer = self.buffer[:n], self.buffer[n:]
+        return data
@@ -0,0 +1,58 @@
+import bisect
+
+# Season standings for players, folded in a game at a time as each game's
+# points arrive: total, games played and average. The full ranking is kept
+# sorted as totals move, so it can be read at any point without re-sorting;
+# ties go to the player seen first, as the old end-of-run sort of the merged
+# totals did.
+
+
+class Leaderboard:
+    def __init__(self):
+        self.games = {}  # game -> player -> points
+        self.history = {}  # player -> game -> points
+        self.seq = {}  # player -> first-seen position
+        self.totals = {}  # player -> points, for players with a game
+        self.ranking = []  # (-total, position, player), best first
+
+    def __len__(self):
+        return len(self.totals)
+
+    def add(self, game, score_dict):
+        # Fold in a game's player -> points; adding a game again replaces it
+        changes = {}
+        for player, points in self.games.get(game, {}).items():
+            changes[player] = changes.get(player, 0) - points
+            del self.history[player][game]
+        self.games[game] = dict(score_dict)
+        for player, points in score_dict.items():
+            if player not in self.seq:
+                self.seq[player] = len(self.seq)
+                self.history[player] = {}
+            changes[player] = changes.get(player, 0) + points
+            self.history[player][game] = points
+        for player, change in changes.items():
+            self.move(player, self.totals.get(player, 0) + change)
+
+    def move(self, player, total):
+        position = self.seq[player]
+        if player in self.totals:
+            entry = (-self.totals[player], position, player)
+            del self.ranking[bisect.bisect_left(self.ranking, entry)]
+        history = self.history[player]
+        if not history:
+            # Every game they were in has been replaced without them
+            del self.totals[player]
+            return
+        self.totals[player] = total
+        bisect.insort(self.ranking, (-total, position, player))
+
+    def average(self, player):
+        return self.totals[player] / len(self.history[player])
+
+    def rows(self):
+        # Rank, Player, Points, Avg. Points for every player, best first
+        return [
+            [rank, player, -neg, round(self.average(player), 2)]
+            for rank, (neg, _, player) in enumerate(self.ranking, 1)
+        ]
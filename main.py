@@ -1,87 +1,100 @@
 import csv
 import re
 import time
-import httpx
-import gspread
-from google.oauth2.service_account import Credentials
-from gspread_formatting import *
 import argparse
 import os
-from datetime import datetime
 import json
+import hashlib
+import copy
+import atexit
+import heapq
+import io
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from atomic_file import atomic_open
+from scorecard_pack import ScorecardPack, write_pack
+from innings_stream import ChunkReader, parse_records, payload_records
+from build_state import cached_result, game_inputs, load_state, save_state
+from standings_ledger import LEDGER_PATH, StandingsLedger
+from metrics import METRICS, METRICS_PATH
+from player_registry import PlayerRegistry, normalize
+from score_accumulator import ScoreAccumulator
+from scoring_rules import DEFAULT_RULES as RULES, bracket_points, load_rules
+from fixture_index import FIXTURES_PATH, FixtureIndex, load_fixtures
+from results_table import DEFAULT_FORMATS, EXPORTERS, ResultsTable, export
+from leaderboard import Leaderboard
+
+# Maximum number of innings requests in flight at once
+MAX_IN_FLIGHT = 8
+
+# Scorecards are cached under data/; unfinished matches are refetched once
+# their copy is older than CACHE_TTL seconds. A match is finished when its
+# event status says so, and a scorecard that has not changed for
+# SETTLED_AFTER seconds is treated as final
+DATA_FOLDER = "data"
+CACHE_TTL = 60
+SETTLED_AFTER = 6 * 60 * 60
+# Finished scorecards packed down to the fields scoring reads (see --ingest)
+PACK_PATH = f"{DATA_FOLDER}/scorecards.pack"
+
+# --live polls a match every LIVE_POLL seconds while its scorecard keeps
+# changing, backing off to LIVE_MAX_POLL while it sits still; matches that
+# have not started yet are checked every LIVE_IDLE_POLL seconds
+LIVE_POLL = 30
+LIVE_MAX_POLL = 300
+LIVE_IDLE_POLL = 600
+
+# Integer keys for every player seen this run; score dicts are keyed by
+# them and only turned back into names for output
+REGISTRY = PlayerRegistry()
+
+# Parsed teams files, keyed by (folder, gameweek)
+roster_cache = {}
+
+# Serve scorecards from data/ and the pack only, never the network
+OFFLINE = False
+
+SHEET_ID = "1AEn2LG9bfTAQdZonbeNe5xg6EI9LXfpf5gcVJ5yD0eM"
+
+# httpx, gspread, google-auth and numpy are imported where they are first
+# needed, so local runs (--offline) start without loading them
+
+
+def border_format():
+    # Define border format
+    from gspread_formatting import Border, Borders
+
+    return Borders(
+        top=Border("SOLID"),
+        bottom=Border("SOLID"),
+        left=Border("SOLID"),
+        right=Border("SOLID"),
+    )
+
 
-team_short_forms = {
-    "Mumbai Indians": "MI",
-    "Chennai Super Kings": "CSK",
-    "Royal Challengers Bengaluru": "RCB",
-    "Kolkata Knight Riders": "KKR",
-    "Sunrisers Hyderabad": "SRH",
-    "Rajasthan Royals": "RR",
-    "Delhi Capitals": "DC",
-    "Punjab Kings": "PBKS",
-    "Lucknow Super Giants": "LSG",
-    "Gujarat Titans": "GT",
-}
-
-# Define border format
-border_format = Borders(
-    top=Border("SOLID"),
-    bottom=Border("SOLID"),
-    left=Border("SOLID"),
-    right=Border("SOLID"),
-)
+def open_doc(credentials="credentials.json", sheet_id=SHEET_ID):
+    # Authenticate with Google Sheets API
+    import gspread
+    from google.oauth2.service_account import Credentials
+    from sheets_publisher import SheetsPublisher
+
+    with METRICS.stage("sheets_auth"):
+        creds = Credentials.from_service_account_file(
+            credentials,
+            scopes=["https://www.googleapis.com/auth/spreadsheets"],
+        )
+        client = gspread.authorize(creds)
+        doc = client.open_by_key(sheet_id)
+    # Sheet writes are queued and sent in one batch at the end of the run
+    return SheetsPublisher(doc)
 
 
 def set_up_ids(folder="."):
-    base = 13485081
-    start_date = start_date = datetime.strptime("2025-03-22", "%Y-%m-%d")
-    id_dict = {}
-    week_dict = {i: {} for i in range(1, 10)}
-    team_count = {v: 0 for v in team_short_forms.values()}
-    with open(f"{folder}/utils/schedule.csv", mode="r") as file:
-        reader = csv.reader(file)
-        for lines in reader:
-            if base + int(lines[0]) - 1 == 13485105:
-                base += 1
-            week = (
-                (datetime.strptime(lines[2].strip(), "%Y-%m-%d") - start_date).days // 7
-            ) + 1
-            id_dict[base + int(lines[0]) - 1] = {
-                "week": week,
-                "team1": team_short_forms[lines[5].strip()],
-                "team2": team_short_forms[lines[6].strip()],
-            }
-            week_dict[week][team_short_forms[lines[5].strip()]] = (
-                week_dict[week].get(team_short_forms[lines[5].strip()], 0) + 1
-            )
-            week_dict[week][team_short_forms[lines[6].strip()]] = (
-                week_dict[week].get(team_short_forms[lines[6].strip()], 0) + 1
-            )
-        print(week_dict)
-    game_dict = {i: [] for i in range(1, 15)}
-    for i, td in id_dict.items():
-        week, t1, t2 = td["week"], td["team1"], td["team2"]
-        team_count[t1] += 1
-        team_count[t2] += 1
-        if team_count[t1] == team_count[t2]:
-            game_dict[team_count[t1]].append([i, week])
-        else:
-            game_dict[team_count[t1]].append([i, week, t1])
-            game_dict[team_count[t2]].append([i, week, t2])
-
-    for i, rows in game_dict.items():
-        with open(f"{folder}/ids/game{i}ids.csv", mode="w") as file:
-            writer = csv.writer(file)
-            for row in rows:
-                spaces = 20 - len(",".join(map(str, row)))
-                writer.writerow(
-                    row[:-1]
-                    + [
-                        str(row[-1])
-                        + spaces * " "
-                        + f'# {id_dict[row[0]]["team1"]} vs {id_dict[row[0]]["team2"]}'
-                    ]
-                )
+    # Rebuild the fixture index from the schedule and print matches per team
+    # for every gameweek
+    index = FixtureIndex.build(folder)
+    index.save(f"{folder}/{FIXTURES_PATH}")
+    print(index.week_counts())
 
 
 def get_column_letter(n):
@@ -92,21 +105,394 @@ def get_column_letter(n):
     return result
 
 
-def get_data(event_id, score_dict, team_choice):
+def is_finished(data, status=None):
+    # The event's status type from SofaScore decides it when we have one.
+    # Without it, a T20 scorecard is complete once the chase is won, or the
+    # second innings is all out or out of overs short of a tie; a tie or a
+    # super over is never taken as the end, as another super over can follow
+    if status is not None:
+        return status == "finished"
+    innings = data.get("innings") or []
+    if len(innings) < 2 or any(inning.get("superOver") for inning in innings):
+        return False
+    first, second = innings[0], innings[1]
+    if second.get("score", 0) > first.get("score", 0):
+        return True
+    return second.get("score", 0) < first.get("score", 0) and (
+        second.get("wickets", 0) >= 10 or second.get("overs", 0) >= 20
+    )
+
+
+def event_status(fetcher, event_id):
+    # "notstarted", "inprogress", "finished", ... or None when it cannot be had
+    from fetch_scheduler import FetchFailed
+
+    url = f"https://www.sofascore.com/api/v1/event/{event_id}"
+    try:
+        response = fetcher.get(url)
+        if response.status_code != 200:
+            return None
+        return response.json()["event"]["status"]["type"]
+    except (FetchFailed, ValueError, KeyError, TypeError):
+        return None
+
+
+def read_cache(event_id, folder=DATA_FOLDER):
+    if not os.path.exists(f"{folder}/{event_id}.json"):
+        return None, None
+    with open(f"{folder}/{event_id}.json", "r") as file:
+        data = json.load(file)
+    if os.path.exists(f"{folder}/{event_id}.meta.json"):
+        with open(f"{folder}/{event_id}.meta.json", "r") as file:
+            meta = json.load(file)
+    else:
+        # Scorecard saved by hand, without fetch metadata
+        mtime = os.path.getmtime(f"{folder}/{event_id}.json")
+        meta = {"fetched_at": mtime, "changed_at": mtime}
+        meta["finished"] = is_finished(data)
+        meta["has_innings"] = bool(data.get("innings"))
+    return data, meta
+
+
+def write_cache(event_id, data, meta, folder=DATA_FOLDER):
+    os.makedirs(folder, exist_ok=True)
+    for path, content in (
+        (f"{folder}/{event_id}.json", data),
+        (f"{folder}/{event_id}.meta.json", meta),
+    ):
+        if content is None:
+            continue
+        with atomic_open(path) as file:
+            json.dump(content, file)
+
+
+def validator_headers(meta):
+    headers = {}
+    if meta and meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta and meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+
+def is_fresh(meta, ttl, now):
+    if meta["finished"]:
+        return True
+    # A scorecard that has not changed for SETTLED_AFTER seconds is final
+    # (rain-shortened and abandoned games never hit the usual finish checks)
+    if meta["has_innings"] and now - meta["changed_at"] >= SETTLED_AFTER:
+        return True
+    return now - meta["fetched_at"] < ttl
+
+
+def record_fetch(event_id, source, start, status=None, size=None):
+    # source is one of pack, cache, offline, network, not_modified, fallback
+    # or failed; size is the number of bytes parsed for the scorecard
+    METRICS.count("fetches", source)
+    fields = {"source": source, "seconds": round(time.perf_counter() - start, 6)}
+    if status is not None:
+        fields["status"] = status
+    if size is not None:
+        fields["bytes"] = size
+        METRICS.count("bytes_parsed", value=size)
+    METRICS.event(event_id, **fields)
+
+
+def cache_size(event_id, folder=DATA_FOLDER):
+    path = f"{folder}/{event_id}.json"
+    return os.path.getsize(path) if os.path.exists(path) else None
+
+
+def fallback_innings(event_id, start, status=None, folder=DATA_FOLDER, stream=False):
+    # The network could not supply the scorecard: serve whatever is on disk,
+    # and score nothing for an event we have never seen
+    data, _ = read_cache(event_id, folder=folder)
+    if data is None:
+        record_fetch(event_id, "failed", start, status)
+        data = {}
+    else:
+        record_fetch(event_id, "fallback", start, status, cache_size(event_id, folder))
+    return list(payload_records(data)) if stream else data
+
+
+def fetch_innings(fetcher, event_id, ttl=None, folder=DATA_FOLDER):
+    # fetcher is a FetchScheduler
+    from fetch_scheduler import FetchFailed
+
+    ttl = CACHE_TTL if ttl is None else ttl
+    now = time.time()
+    start = time.perf_counter()
+    data, meta = read_cache(event_id, folder=folder)
+    if data is not None and is_fresh(meta, ttl, now):
+        record_fetch(event_id, "cache", start, size=cache_size(event_id, folder))
+        return data
+
+    url = f"https://www.sofascore.com/api/v1/event/{event_id}/innings"
+    try:
+        response = fetcher.get(url, headers=validator_headers(meta))
+    except FetchFailed as error:
+        print(error)
+        return fallback_innings(event_id, start, folder=folder)
+    print(response.status_code)
+    status = response.status_code
+    if status == 304 and data is not None:
+        meta["fetched_at"] = now
+        if meta["has_innings"]:
+            meta["status"] = event_status(fetcher, event_id)
+            meta["finished"] = is_finished(data, meta["status"])
+        write_cache(event_id, data, meta, folder=folder)
+        record_fetch(
+            event_id, "not_modified", start, status, cache_size(event_id, folder)
+        )
+        return data
+    fetched = None
+    if status == 200:
+        try:
+            fetched = response.json()
+        except ValueError:
+            pass
+    if not isinstance(fetched, dict):
+        # Blocked, failing or garbled upstream
+        return fallback_innings(event_id, start, status, folder=folder)
+
+    record_fetch(event_id, "network", start, status, len(response.content))
+    match_status = event_status(fetcher, event_id) if fetched.get("innings") else None
+    write_cache(
+        event_id,
+        fetched,
+        {
+            "fetched_at": now,
+            "changed_at": meta["changed_at"] if fetched == data else now,
+            "finished": is_finished(fetched, match_status),
+            "status": match_status,
+            "has_innings": bool(fetched.get("innings")),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        },
+        folder=folder,
+    )
+    return fetched
+
+
+def stream_innings(fetcher, event_id, ttl=None, folder=DATA_FOLDER):
+    # Scoring records for one event, parsed while the body downloads and
+    # copied into the cache as it goes. A body that breaks off after records
+    # have been handed out raises FetchFailed
+    from fetch_scheduler import FetchFailed
+
+    ttl = CACHE_TTL if ttl is None else ttl
+    now = time.time()
+    start = time.perf_counter()
+    path = f"{folder}/{event_id}.json"
+    meta = None
+    if os.path.exists(f"{folder}/{event_id}.meta.json"):
+        with open(f"{folder}/{event_id}.meta.json", "r") as file:
+            meta = json.load(file)
+        if os.path.exists(path) and is_fresh(meta, ttl, now):
+            with open(path, "rb") as file:
+                yield from parse_records(file)
+            record_fetch(event_id, "cache", start, size=cache_size(event_id, folder))
+            return
+    elif os.path.exists(path):
+        data, meta = read_cache(event_id, folder=folder)
+        if is_fresh(meta, ttl, now):
+            yield from payload_records(data)
+            record_fetch(event_id, "cache", start, size=cache_size(event_id, folder))
+            return
+
+    url = f"https://www.sofascore.com/api/v1/event/{event_id}/innings"
+    status = None
+    try:
+        with fetcher.stream(url, headers=validator_headers(meta)) as response:
+            print(response.status_code)
+            status = response.status_code
+            if status == 200:
+                summaries = []
+                try:
+                    with atomic_open(path, "wb") as sink:
+                        body = ChunkReader(response.iter_bytes(), sink=sink)
+                        yield from parse_records(body, summaries)
+                        body.read()  # Drain anything after the innings array
+                except ValueError as error:
+                    raise FetchFailed(url, error, status) from error
+                record_fetch(event_id, "network", start, status, body.size)
+    except FetchFailed as error:
+        print(error)
+        if status == 200:
+            raise
+    if status != 200:
+        if status == 304 and os.path.exists(path):
+            meta["fetched_at"] = now
+            if meta["has_innings"]:
+                meta["status"] = event_status(fetcher, event_id)
+                if meta["status"] is not None:
+                    meta["finished"] = is_finished({}, meta["status"])
+            write_cache(event_id, None, meta, folder=folder)
+            with open(path, "rb") as file:
+                yield from parse_records(file)
+            record_fetch(event_id, "not_modified", start, status, os.path.getsize(path))
+        else:
+            # Blocked, failing or unreachable upstream
+            yield from fallback_innings(event_id, start, status, folder, stream=True)
+        return
+
+    with open(path, "rb") as file:
+        digest = hashlib.sha1(file.read()).hexdigest()
+    match_status = event_status(fetcher, event_id) if summaries else None
+    write_cache(
+        event_id,
+        None,
+        {
+            "fetched_at": now,
+            "changed_at": (
+                meta["changed_at"] if meta and meta.get("sha1") == digest else now
+            ),
+            "finished": is_finished({"innings": summaries}, match_status),
+            "status": match_status,
+            "has_innings": bool(summaries),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "sha1": digest,
+        },
+        folder=folder,
+    )
+
+
+def fetch_all_innings(event_ids, max_in_flight=MAX_IN_FLIGHT, ttl=None, stream=False):
+    # One long-lived HTTP/2 client shared by every request, with at most
+    # max_in_flight requests outstanding at any time
+    event_ids = list(event_ids)
+    if not event_ids:
+        return {}
+    if OFFLINE:
+        return read_all_innings(event_ids, stream=stream)
+    import httpx
+    from fetch_scheduler import FetchFailed, FetchScheduler
+
+    limits = httpx.Limits(
+        max_connections=max_in_flight, max_keepalive_connections=max_in_flight
+    )
+    with httpx.Client(http2=True, limits=limits) as client:
+        fetcher = FetchScheduler(client)
+
+        def fetch(event_id):
+            if stream:
+                start = time.perf_counter()
+                try:
+                    return list(stream_innings(fetcher, event_id, ttl=ttl))
+                except FetchFailed:
+                    # The body broke off or was garbled; score the local copy instead
+                    return fallback_innings(event_id, start, stream=True)
+            return fetch_innings(fetcher, event_id, ttl=ttl)
+
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            payloads = executor.map(fetch, event_ids)
+            return dict(zip(event_ids, payloads))
+
+
+def read_all_innings(event_ids, folder=DATA_FOLDER, stream=False):
+    # Whatever is cached on disk, stale or not; missing events score nothing
+    payloads = {}
+    for event_id in event_ids:
+        start = time.perf_counter()
+        data, _ = read_cache(event_id, folder=folder)
+        record_fetch(event_id, "offline", start, size=cache_size(event_id, folder))
+        data = {} if data is None else data
+        payloads[event_id] = list(payload_records(data)) if stream else data
+    return payloads
+
+
+def ingest_scorecards(folder=DATA_FOLDER, path=PACK_PATH):
+    # Pack every finished scorecard in the cache into one compact file, each
+    # stamped with the mtime of its JSON
+    payloads = {}
+    mtimes = {}
+    now = time.time()
+    for file_name in os.listdir(folder):
+        event_id = file_name.removesuffix(".json")
+        if not event_id.isdigit():
+            continue
+        data, meta = read_cache(event_id, folder=folder)
+        if is_fresh(meta, 0, now) and "innings" in data:
+            payloads[event_id] = data
+            mtimes[event_id] = os.stat(f"{folder}/{event_id}.json").st_mtime_ns
+    write_pack(payloads, path, mtimes)
+    print(f"Packed {len(payloads)} scorecards into {path}")
+
+
+def open_pack(path=PACK_PATH, folder=DATA_FOLDER):
+    # The scorecard pack, rebuilt first when it is missing, from an older
+    # version, or holds a scorecard whose JSON has been rewritten since it
+    # was packed; None when there is no cache to build it from
+    pack = None
+    if os.path.exists(path):
+        try:
+            pack = ScorecardPack(path)
+        except ValueError:
+            pass
+    if pack is not None and not any(
+        os.path.exists(f"{folder}/{e}.json")
+        and os.stat(f"{folder}/{e}.json").st_mtime_ns != pack.mtime(e)
+        for e in pack
+    ):
+        return pack
+    if pack is not None:
+        pack.close()
+    if not os.path.isdir(folder):
+        return None
+    ingest_scorecards(folder, path)
+    return ScorecardPack(path)
+
+
+def load_payloads(event_ids, ttl=None, path=PACK_PATH, stream=False):
+    # Packed scorecards are final; everything else goes through the cache.
+    # With stream=True every value is a list of scoring records instead
+    event_ids = list(event_ids)
+    payloads = {}
+    with METRICS.stage("fetch"):
+        pack = open_pack(path)
+        if pack is not None:
+            payloads = {e: pack.payload(e) for e in event_ids if e in pack}
+            pack.close()  # The payloads are plain copies, nothing points into it
+            for event_id in payloads:
+                METRICS.count("fetches", "pack")
+                METRICS.event(event_id, source="pack")
+            if stream:
+                payloads = {e: list(payload_records(p)) for e, p in payloads.items()}
+        payloads.update(
+            fetch_all_innings(
+                [e for e in event_ids if e not in payloads], ttl=ttl, stream=stream
+            )
+        )
+    # Key every scorecard player up front in event order, so an id keeps the
+    # first name it was seen under whichever process ends up scoring it
+    for event_id in event_ids:
+        register_players(payloads.get(event_id), stream=stream)
+    return payloads
+
+
+def register_players(payload, stream=False):
+    records = payload if stream else payload_records(payload or {})
+    for kind, record in records or []:
+        if kind != "inning":
+            REGISTRY.key(record["player"])
+
+
+def get_data(
+    event_id, score_dict, team_choice, data=None, records=None, stream=False
+):
     if team_choice == "avg":
         compute_from_avg(event_id, score_dict)
         return None
-    
-    url = f"https://www.sofascore.com/api/v1/event/{event_id}/innings?nocache={int(time.time())}"
 
-    with httpx.Client(http2=True) as client:
-        response = client.get(url)
-        data = response.json()
-    print(response.status_code)
-    if (response.status_code == 403):
-        if os.path.exists(f"data/{event_id}.json"):
-            with open(f"data/{event_id}.json", "r") as file:
-                data = json.load(file)
+    if data is None and records is None:
+        # Same scheduler and fallbacks as a batch fetch, offline included
+        payload = fetch_all_innings([event_id], stream=stream)[event_id]
+        if stream:
+            return compute_records(payload, score_dict, team_choice)
+        data = payload
+    if records is not None:
+        return compute_records(records, score_dict, team_choice)
 
     if "innings" not in data:
         return None
@@ -122,16 +508,115 @@ def get_data(event_id, score_dict, team_choice):
             choice = None
         compute_innings(inning, score_dict, catch_dict, choice)
 
-    for k, v in catch_dict.items():
-        score_dict[k] = score_dict.get(k, 4) + v * 8 + (4 if v >= 3 else 0)
+    apply_catches(catch_dict, score_dict)
     return data
 
+
+def compute_records(records, score_dict, team_choice):
+    # Same scoring as get_data, driven by a stream of innings records
+    catch_dict = {}
+    choice = None
+    for kind, record in records:
+        if kind == "inning":
+            bat_team, bowl_team = record
+            if bat_team == team_choice:
+                choice = "batting"
+            elif bowl_team == team_choice:
+                choice = "bowling"
+            else:
+                choice = None
+        elif kind == "bowler" and choice != "batting":
+            player = REGISTRY.key(record["player"])
+            if player not in score_dict:
+                score_dict[player] = RULES["appearance"]
+            compute_bowler(record, score_dict, player)
+        elif kind == "batsman":
+            player = REGISTRY.key(record["player"])
+            if player not in score_dict and choice != "bowling":
+                score_dict[player] = RULES["appearance"]
+            compute_batsman(record, score_dict, catch_dict, choice, player)
+
+    apply_catches(catch_dict, score_dict)
+    return None
+
+
+def apply_catches(catch_dict, score_dict):
+    for k, v in catch_dict.items():
+        bonus = RULES["catch_bonus"] if v >= RULES["catch_bonus_min"] else 0
+        score_dict.add(k, v * RULES["catch"] + bonus, RULES["appearance"])
+
+
 def compute_from_avg(event_id, score_dict):
     with open(f"data/{event_id}Avg.csv") as file:
         reader = csv.reader(file)
         for line in reader:
-            score_dict[line[0]] = int(line[1])
-    print(score_dict)
+            score_dict[REGISTRY.resolve(line[0])] = int(line[1])
+    print(REGISTRY.named(score_dict.ranked()))
+
+
+def read_avg(event_id):
+    with open(f"data/{event_id}Avg.csv") as file:
+        return [(line[0], int(line[1])) for line in csv.reader(file)]
+
+
+def score_games(games, folder=".", payloads=None):
+    # Score every event of every game in one vectorized pass
+    from scoring_engine import score_season
+
+    if payloads is None:
+        payloads = prefetch_games(games, folder=folder)
+    events = []
+    for game in games:
+        for event_id, e_dict in read_event_ids(game, folder=folder).items():
+            if e_dict["team_choice"] == "avg":
+                events.append((game, event_id, "avg", None, read_avg(event_id)))
+            else:
+                events.append(
+                    (
+                        game,
+                        event_id,
+                        e_dict["team_choice"],
+                        payloads.get(event_id),
+                        None,
+                    )
+                )
+    with METRICS.stage("vector_scoring"):
+        return score_season(events, REGISTRY)
+
+
+def compare_rules(games, rules, payloads=None, label="what-if"):
+    # Score the games under the official rules and under `rules`, from the
+    # same parsed lines, and print the league table both ways. Nothing is
+    # written: no result files, ledger, database or sheet
+    official = score_games(games, payloads=payloads)
+    totals = []
+    for season in (official, official.rescore(rules)):
+        ledger = StandingsLedger(None)
+        for game in games:
+            with contextlib.redirect_stdout(io.StringIO()):
+                main(
+                    None,
+                    game,
+                    Leaderboard(),
+                    update_sheet=False,
+                    payloads=payloads,
+                    season=season,
+                    ledger=ledger,
+                    formats=(),
+                )
+        totals.append(ledger.totals)
+    before, after = totals
+    places = {
+        p: rank
+        for rank, p in enumerate(sorted(before, key=before.get, reverse=True), 1)
+    }
+    print(f"\nSTANDINGS WITH {label}:")
+    for rank, p in enumerate(sorted(after, key=after.get, reverse=True), 1):
+        change = after[p] - before.get(p, 0)
+        print(
+            f"{rank}) {p}: {after[p]} ({change:+d},"
+            f" officially #{places.get(p, '-')} on {before.get(p, 0)})"
+        )
 
 
 def compute_innings(inning, score_dict, catch_dict, choice):
@@ -139,29 +624,32 @@ def compute_innings(inning, score_dict, catch_dict, choice):
     bowl_team = inning["bowlingTeam"]["shortName"]
     if choice != "batting":
         for bowler in inning["bowlingLine"]:
-            if bowler["player"]["name"] not in score_dict:
-                score_dict[bowler["player"]["name"]] = 4
-            compute_bowler(bowler, score_dict)
+            player = REGISTRY.key(bowler["player"])
+            if player not in score_dict:
+                score_dict[player] = RULES["appearance"]
+            compute_bowler(bowler, score_dict, player)
     for batsman in inning["battingLine"]:
-        if batsman["player"]["name"] not in score_dict and choice != "bowling":
-            score_dict[batsman["player"]["name"]] = 4
-        compute_batsman(batsman, score_dict, catch_dict, choice)
+        player = REGISTRY.key(batsman["player"])
+        if player not in score_dict and choice != "bowling":
+            score_dict[player] = RULES["appearance"]
+        compute_batsman(batsman, score_dict, catch_dict, choice, player)
     return (bat_team, bowl_team)
 
 
-def compute_bowler(bowler, score_dict):
-    name = bowler["player"]["name"]
+def compute_bowler(bowler, score_dict, player=None):
+    if player is None:
+        player = REGISTRY.key(bowler["player"])
     overs = bowler["over"]
     economy = (bowler["run"] / convert_overs(overs)) if overs > 0 else 8
     wickets = bowler["wicket"]
     maidens = bowler["maiden"]
     score = (
-        wickets * 25
-        + maidens * 12
+        wickets * RULES["wicket"]
+        + maidens * RULES["maiden"]
         + economy_score(economy, overs)
         + wicket_bonus(wickets)
     )
-    score_dict[name] = score_dict.get(name, 4) + score
+    score_dict.add(player, score, RULES["appearance"])
 
 
 def convert_overs(overs):
@@ -171,47 +659,29 @@ def convert_overs(overs):
 
 
 def economy_score(economy, overs):
-    if overs >= 2:
-        if economy < 5:
-            return 6
-        elif economy < 6:
-            return 4
-        elif economy < 7:
-            return 2
-        elif economy < 10:
-            return 0
-        elif economy < 11:
-            return -2
-        elif economy < 12:
-            return -4
-        else:
-            return -6
+    if overs >= RULES["economy_min_overs"]:
+        return bracket_points(economy, RULES, "economy")
     else:
         return 0
 
 
 def wicket_bonus(wickets):
-    if wickets == 3:
-        return 4
-    elif wickets == 4:
-        return 8
-    elif wickets >= 5:
-        return 16
-    else:
-        return 0
+    bonus = RULES["wicket_bonus"]
+    return bonus[min(wickets, len(bonus) - 1)]
 
 
-def compute_batsman(batsman, score_dict, catch_dict, choice):
-    name = batsman["player"]["name"]
+def compute_batsman(batsman, score_dict, catch_dict, choice, player=None):
+    if player is None:
+        player = REGISTRY.key(batsman["player"])
     runs = batsman["score"]
     fours = batsman["s4"]
     sixes = batsman["s6"]
     balls = batsman["balls"]
     sr = 100 if balls == 0 else ((runs * 100) / balls)
     score = (
-        runs
-        + fours * 1
-        + sixes * 2
+        runs * RULES["run"]
+        + fours * RULES["four"]
+        + sixes * RULES["six"]
         + sr_bonus(sr, batsman["player"], balls)
         + duck_check(
             runs, batsman["player"], batsman["wicketTypeName"] != "Not out", balls
@@ -219,84 +689,63 @@ def compute_batsman(batsman, score_dict, catch_dict, choice):
         + run_bonus(runs)
     )
     if choice != "bowling":
-        score_dict[name] = score_dict.get(name, 4) + score
+        score_dict.add(player, score, RULES["appearance"])
     wicket_type = batsman["wicketTypeName"]
     if wicket_type != "Not out" and choice != "batting":
         compute_wicket(wicket_type, batsman, score_dict, catch_dict)
 
 
 def sr_bonus(sr, player, balls):
-    if player["position"] != "B" and balls >= 10:
-        if sr < 50:
-            return -6
-        elif sr < 60:
-            return -4
-        elif sr < 70:
-            return -2
-        elif sr < 130:
-            return 0
-        elif sr < 150:
-            return 2
-        elif sr < 170:
-            return 4
-        else:
-            return 6
+    if player["position"] != "B" and balls >= RULES["strike_rate_min_balls"]:
+        return bracket_points(sr, RULES, "strike_rate")
     else:
         return 0
 
 
 def duck_check(runs, player, is_out, balls):
     if player["position"] != "B" and runs == 0 and is_out and balls > 0:
-        return -2
+        return RULES["duck"]
     else:
         return 0
 
 
 def run_bonus(runs):
-    if runs < 30:
-        return 0
-    elif runs < 50:
-        return 4
-    elif runs < 100:
-        return 8
-    else:
-        return 16
+    return bracket_points(runs, RULES, "run_bonus")
 
 
 def compute_wicket(type, batsman, score_dict, catch_dict):
     if type == "Bowled" or type == "LBW":
-        score_dict[batsman["wicketBowlerName"]] += 8
+        score_dict[REGISTRY.credit(batsman, "wicketBowler")] += RULES["bowled_lbw"]
     elif type == "Caught" or type == "Caught & Bowled":
-        if batsman["wicketCatchName"] not in catch_dict:
-            catch_dict[batsman["wicketCatchName"]] = 1
+        catcher = REGISTRY.credit(batsman, "wicketCatch")
+        if catcher not in catch_dict:
+            catch_dict[catcher] = 1
         else:
-            catch_dict[batsman["wicketCatchName"]] += 1
+            catch_dict[catcher] += 1
     elif type == "Stumped":
-        score_dict[batsman["wicketCatchName"]] = (
-            score_dict.get(batsman["wicketCatchName"], 4) + 12
-        )
+        catcher = REGISTRY.credit(batsman, "wicketCatch")
+        score_dict.add(catcher, RULES["stumping"], RULES["appearance"])
     elif type == "Run out":
-        score_dict[batsman["wicketCatchName"]] = (
-            score_dict.get(batsman["wicketCatchName"], 6) + 6
-        )
-
-
-def get_participant_points(
-    score_dict,
-    gw_no,
-    participant_dict,
-    best_xi_dict,
-    missing_set,
-    player_team_gw_dict,
-    num_players=11,
-    folder=".",
-):
+        catcher = REGISTRY.credit(batsman, "wicketCatch")
+        score_dict.add(catcher, RULES["run_out"], RULES["run_out_appearance"])
+
+
+def load_roster(gw_no, folder="."):
+    # Parse teams/gw{gw_no}teams.csv once per run into player key ->
+    # ownership entries, resolving every name against the registry here;
+    # returns None when the gameweek has no teams file
+    cache_key = (folder, str(gw_no))
+    if cache_key in roster_cache:
+        return roster_cache[cache_key]
+    REGISTRY.load_aliases(folder)
+    roster = None
     try:
         with open(f"{folder}/teams/gw{gw_no}teams.csv", mode="r") as file:
             reader = csv.reader(file)
             key = "feewd XI"
             role = None
-            player_lst, point_lst, role_lst = [], [], []
+            section, position = 0, 0
+            roster = {}
 
             for line in reader:
                 for text in line:
@@ -304,31 +753,92 @@ def get_participant_points(
                     text = re.sub(r"\s+", " ", text)  # Normalize spaces
 
                     if text.startswith("*"):  # New team detected
-                        update_dict_points(
-                            participant_dict, key, player_lst, point_lst, role_lst
-                        )
                         key = text[1:].strip()
-                        player_lst, point_lst, role_lst = [], [], []
+                        section += 1
                     elif text.lower() in ["batsmen", "all-rounders", "bowlers"]:
                         role = text.lower()
                     elif text:  # This is a player
-                        player_name = text[:-5] if text.endswith("(WK)") else text
-                        if (
-                            player_name in score_dict
-                            and player_team_gw_dict[player_name] == gw_no
-                        ):
-                            player_lst.append(text)
-                            point_lst.append(score_dict[player_name])
-                            role_lst.append(role)
-                        else:
-                            if (player_name not in player_team_gw_dict) or (
-                                player_team_gw_dict[player_name] == gw_no
-                            ):
-                                missing_set.add(player_name)  # Missing player warning
-
-            update_dict_points(participant_dict, key, player_lst, point_lst, role_lst)
+                        player_name = normalize(text)
+                        player = REGISTRY.resolve(player_name)
+                        roster.setdefault(player, []).append(
+                            {
+                                "participant": key,
+                                "key": player,
+                                "name": player_name,
+                                "player": text,
+                                "role": role,
+                                "wk": text.endswith("(WK)"),
+                                "gw": str(gw_no),
+                                "section": section,
+                                "position": position,
+                            }
+                        )
+                        position += 1
     except FileNotFoundError:
         pass
+    roster_cache[cache_key] = roster
+    return roster
+
+
+def get_participant_points(
+    score_dict,
+    gw_no,
+    participant_dict,
+    player_team_gw_dict,
+    folder=".",
+    new_players=None,
+):
+    # Attribute the points of players first seen in this gameweek to their
+    # owners; new_players narrows the lookup to the players an event added
+    roster = load_roster(gw_no, folder=folder)
+    if roster is None:
+        return
+    entries = []
+    for player in score_dict if new_players is None else new_players:
+        if player in roster and player_team_gw_dict[player] == gw_no:
+            entries.extend(roster[player])
+
+    # Hand players over section by section in roster order, as the teams
+    # file lists them
+    entries.sort(key=lambda entry: entry["position"])
+    sections = {}
+    for entry in entries:
+        sections.setdefault(entry["section"], []).append(entry)
+    for section in sections.values():
+        update_dict_points(
+            participant_dict,
+            section[0]["participant"],
+            [entry["player"] for entry in section],
+            [score_dict[entry["key"]] for entry in section],
+            [entry["role"] for entry in section],
+        )
+
+
+def attribute_event(score_dict, gw_no, participant_dict, folder="."):
+    # Close an event on the accumulator and hand the players it introduced
+    # to their owners
+    new_players = score_dict.end_event(gw_no)
+    get_participant_points(
+        score_dict,
+        gw_no,
+        participant_dict,
+        score_dict.first_gw,
+        folder=folder,
+        new_players=new_players,
+    )
+
+
+def find_missing(gw_no, score_dict, folder="."):
+    # Roster players that have not appeared in any scorecard yet
+    roster = load_roster(gw_no, folder=folder)
+    if roster is None:
+        return set()
+    return {
+        entry["name"]
+        for player, entries in roster.items()
+        if player not in score_dict
+        for entry in entries
+    }
 
 
 def update_dict_points(participant_dict, key, player_lst, point_lst, role_lst):
@@ -346,45 +856,77 @@ def update_dict_points(participant_dict, key, player_lst, point_lst, role_lst):
                 participant_dict[key].append((player, points, role))
 
 
+def top_counts(bat, bowl, ar, slots=10, cap=5):
+    # Exact best role counts: up to `cap` batsmen and bowlers with
+    # all-rounders filling the slots left, most players first and then most
+    # points. Each pool is sorted best first, so the best n of a role is its
+    # prefix and the search is over at most (cap + 1)^2 count pairs. Ties go
+    # to the pick whose players rank highest overall
+    prefix = []
+    for pool in (bat, bowl, ar):
+        sums = [0]
+        for rank in pool:
+            sums.append(sums[-1] - rank[0])
+        prefix.append(sums)
+    bat_sums, bowl_sums, ar_sums = prefix
+
+    best_key, best_counts = None, None
+    for b in range(min(cap, len(bat)) + 1):
+        for w in range(min(cap, len(bowl), slots - b) + 1):
+            a = min(slots - b - w, len(ar))
+            key = (b + w + a, bat_sums[b] + bowl_sums[w] + ar_sums[a])
+            if best_key is None or key > best_key:
+                best_key, best_counts = key, (b, w, a)
+            elif key == best_key:
+                counts = (b, w, a)
+                if sorted(bat[:b] + bowl[:w] + ar[:a]) < sorted(
+                    bat[: best_counts[0]]
+                    + bowl[: best_counts[1]]
+                    + ar[: best_counts[2]]
+                ):
+                    best_counts = counts
+    return best_counts
+
+
 def get_best_xi(participant_dict, best_xi_dict):
-    # Sorting teams by player points (descending order)
+    # Up to 5 batsmen (spare WKs count as batsmen), up to 5 bowlers and
+    # all-rounders filling the rest around one mandatory WK, solved exactly
+    # by top_counts. Only the best 10 of each role can make the side, so each
+    # role is cut down with a partial sort. C/VC go to the two highest
+    # scorers, the WK included
     for team, players in participant_dict.items():
-        # Categorizing players based on roles
+        # Categorizing players based on roles; a player ranks by points,
+        # then batsmen, bowlers, all-rounders and spare WKs as listed
         batsmen, bowlers, all_rounders, wks = [], [], [], []
+        offsets = {"batsmen": 0, "bowlers": 1, "all-rounders": 2}
 
-        for player, points, role in players:
+        for i, (player, points, role) in enumerate(players):
             if "(WK)" in player:
-                wks.append((player[:-5], points))
+                wks.append((-points, (3, i), player[:-5], "bat"))
             elif role == "batsmen":
-                batsmen.append((player, points))
+                batsmen.append((-points, (offsets[role], i), player, "bat"))
             elif role == "bowlers":
-                bowlers.append((player, points))
+                bowlers.append((-points, (offsets[role], i), player, "bowl"))
             elif role == "all-rounders":
-                all_rounders.append((player, points))
+                all_rounders.append((-points, (offsets[role], i), player, "ar"))
 
-        # Sorting all categories by points
-        batsmen.sort(key=lambda x: -x[1])
-        bowlers.sort(key=lambda x: -x[1])
-        all_rounders.sort(key=lambda x: -x[1])
-        wks.sort(key=lambda x: -x[1])
-
-        # Selecting the best XI
-        conf_bat, conf_bowl, conf_ar, conf_wk = [], [], [], []
-        tc = 0
-        batsmen_count, bowlers_count, ar_count = 0, 0, 0
-
-        # Ensure at least one WK is in the team
+        # Best WK is the first listed among the top scorers
+        wk, wk_points = "N/A", 0
         if wks:
-            conf_wk.append(wks.pop(0))  # Pick best WK
-        tc += 1
+            top = min(wks, key=lambda x: (x[0], x[1][1]))
+            wks.remove(top)
+            wk, wk_points = top[2], -top[0]
 
-        wk, wk_points = conf_wk[0] if conf_wk else ("N/A", 0)
-        wk_capt, wk_vc = False, False
+        bat = heapq.nsmallest(10, batsmen + wks)
+        bowl = heapq.nsmallest(10, bowlers)
+        ar = heapq.nsmallest(10, all_rounders)
+        b, w, a = top_counts(bat, bowl, ar)
+        chosen = sorted(bat[:b] + bowl[:w] + ar[:a])
 
-        # Merge all categories for best selection
-        all_players = batsmen + bowlers + all_rounders + wks
-        all_players.sort(key=lambda x: -x[1])  # Sort by points
-        for player, points in all_players:
+        conf_bat, conf_bowl, conf_ar = [], [], []
+        wk_capt, wk_vc = False, False
+        for tc, (neg_points, _, player, kind) in enumerate(chosen, start=1):
+            points = -neg_points
             player_to_add = player
             if tc == 1 and wk_points < points:
                 player_to_add = player + " (C)"
@@ -395,28 +937,10 @@ def get_best_xi(participant_dict, best_xi_dict):
                 player_to_add = player + " (VC)"
             elif tc == 2:
                 wk_vc = True
-            if tc == 11:
-                break  # Stop when we have 11 players
-
-            # Add batsmen (including WKs)
-            if (
-                (player, points) in batsmen or (player, points) in wks
-            ) and batsmen_count < 5:
-                conf_bat.append((player_to_add, points))
-                batsmen_count += 1
-                tc += 1
-
-            # Add bowlers
-            elif (player, points) in bowlers and bowlers_count < 5:
-                conf_bowl.append((player_to_add, points))
-                bowlers_count += 1
-                tc += 1
-
-            # Allow all-rounders to fill gaps
-            elif (player, points) in all_rounders:
-                conf_ar.append((player_to_add, points))
-                ar_count += 1
-                tc += 1
+            {"bat": conf_bat, "bowl": conf_bowl, "ar": conf_ar}[kind].append(
+                (player_to_add, points)
+            )
+        batsmen_count, ar_count = len(conf_bat), len(conf_ar)
 
         if wk:
             if wk_capt:
@@ -439,209 +963,472 @@ def get_best_xi(participant_dict, best_xi_dict):
     return participant_dict
 
 
-def output_participant_points(best_xi_dict, missing_set, game, folder="."):
-    max_per_row = 4
+def output_participant_points(
+    best_xi_dict, missing_set, game, players, events=None, names=None
+):
+    # The game's results table, with the standings printed on the way
     if len(missing_set) > 0:
         print("MISSING PLAYERS:")
         for player in missing_set:
             print(player)
-    # Writing output to CSV and calculating standings
-    standings = {}
-    with open(f"{folder}/points/game{game}points.csv", mode="w", newline="") as file:
-        writer = csv.writer(file)
-
-        teams = list(best_xi_dict.items())
-        team_chunks = [
-            teams[i : i + max_per_row] for i in range(0, len(teams), max_per_row)
-        ]  # Split into groups of 4
-
-        for chunk in team_chunks:
-            # Write team names and points in a single row
-            row = []
-            for team, best_xi in chunk:
-                team_points = sum(int(p[1]) for p in best_xi)
-                row.extend([team, team_points, ""])
-                standings[team] = team_points
-            writer.writerow(row)
-
-            # Get max number of players in the chunk
-            max_players = 11
-
-            # Write players row by row
-            for i in range(max_players):
-                row = []
-                for _, best_xi in chunk:
-                    if i < len(best_xi):
-                        row.extend(
-                            [best_xi[i][0], best_xi[i][1], ""]
-                        )  # Player name, points
-                    else:
-                        row.extend(["N/A", 0, ""])  # Empty cells for alignment
-                writer.writerow(row)
-
-            writer.writerow([])  # Blank row for spacing
-
-    standings = dict(sorted(standings.items(), key=lambda item: item[1], reverse=True))
+    results = ResultsTable(game, players, best_xi_dict, events, names)
 
     print("\nSTANDINGS:")
-    for rank, (team, points) in enumerate(standings.items(), 1):
+    for rank, (team, points) in enumerate(results.standings.items(), 1):
         print(f"{rank}) {team}: {points}")
-    return standings
+    return results
 
 
-def print_to_sheets(doc, game, data, standings, folder="."):
+def print_to_sheets(doc, results, ledger, folder="."):
+    sheet = print_standings_to_sheet(doc, results.game, ledger, folder=folder)
+    range_name, values = results.sheet_range()
+    sheet.update(values=values, range_name=range_name)
+
+
+class SheetsExporter:
+    # The game's worksheet: league table from the ledger, points grid below
+    def __init__(self, doc, ledger, folder="."):
+        self.doc = doc
+        self.ledger = ledger
+        self.folder = folder
+
+    def export(self, results):
+        with METRICS.stage("sheets_queue"):
+            print_to_sheets(self.doc, results, self.ledger, folder=self.folder)
+
+
+def print_standings_to_sheet(doc, game, ledger, folder="."):
+    from gspread_formatting import CellFormat, TextFormat
+
     worksheets = doc.worksheets()
     no_sheets = len(worksheets)
     if no_sheets < game + 1:
         doc.add_worksheet(title=f"GAME {game} TABLE", rows="1000", cols="26")
     sheet = doc.get_worksheet(game - 1)
 
-    # Use the first sheet
-    rankings = []
-    if game == 1:
-        rankings = sheet.get_all_values()[:8]
-    else:
-        rankings = doc.get_worksheet(game - 2).get_all_values()[:8]
-    columns = list(map(list, zip(*rankings)))
-    columns += [['']*8]
-    for i, p in enumerate(columns[1][1:], start=1):
-        columns[game + 1][i] = standings[p] if p in standings else 0
-    columns[game + 1][0] = f"Game {game}"
-    columns[game + 2][0] = "TOTAL"
-    for i in range(len(columns[0]) - 1):
-        columns[game + 2][i + 1] = sum(
-            int(columns[j][i + 1]) for j in range(2, game + 2)
-        )
-    rankings = list(map(list, zip(*columns)))
-    rankings = [rankings[0]] + sorted(
-        rankings[1:], key=lambda x: x[game + 2], reverse=True
-    )
-    for i, r in enumerate(rankings[1:], start=1):
-        r[0] = i
+    # The league table comes from the local ledger; the sheet only mirrors it
+    rankings = ledger.table(game)
     sheet.update(values=rankings, range_name="A1")
-    sheet.update(values=data, range_name="B15")
     # Apply to a range (e.g., A1:D10)
-    format_cell_range(
-        sheet,
-        f"A1:{get_column_letter(game + 3)}8",
-        CellFormat(borders=border_format, horizontalAlignment="CENTER"),
+    sheet.format(
+        f"A1:{get_column_letter(game + 3)}{len(rankings)}",
+        CellFormat(borders=border_format(), horizontalAlignment="CENTER"),
     )
-    format_cell_range(
-        sheet,
+    sheet.format(
         f"A1:{get_column_letter(game + 3)}1",
         CellFormat(textFormat=TextFormat(bold=True), horizontalAlignment="CENTER"),
     )
+    return sheet
 
 
-def print_player_rank_to_sheet(doc, global_score_dict, folder="."):
+def print_player_rank_to_sheet(doc, leaderboard, folder="."):
+    from gspread_formatting import CellFormat, TextFormat
+
     no_sheets = len(doc.worksheets())
     player_rank_sheet = doc.get_worksheet(no_sheets - 1)
+    rows = leaderboard.rows()
     player_rank_sheet.update(
-        values=[["Rank", "Player", "Points", "Avg. Points"]]
-        + [[i, k, v[0], v[1]] for i, (k, v) in enumerate(global_score_dict.items(), 1)],
+        values=[["Rank", "Player", "Points", "Avg. Points"]] + rows,
         range_name="A1",
     )
     # Apply to a range (e.g., A1:D10)
-    format_cell_range(
-        player_rank_sheet,
-        f"A1:{get_column_letter(4)}{len(global_score_dict) + 1}",
-        CellFormat(borders=border_format, horizontalAlignment="CENTER"),
+    player_rank_sheet.format(
+        f"A1:{get_column_letter(4)}{len(rows) + 1}",
+        CellFormat(borders=border_format(), horizontalAlignment="CENTER"),
     )
-    format_cell_range(
-        player_rank_sheet,
+    player_rank_sheet.format(
         f"A1:{get_column_letter(4)}1",
         CellFormat(textFormat=TextFormat(bold=True), horizontalAlignment="CENTER"),
     )
 
 
-def output_unsold(participant_dict, game, folder="."):
+def output_unsold(participant_dict, results):
     print("\nUNSOLD:")
-    players = [v[0].removesuffix(" (WK)") for s in participant_dict.values() for v in s]
-    with open(f"{folder}/calcSheet{game}.csv", mode="r") as file:
-        data = csv.reader(file)
-        for line in data:
-            if line[0].split(":")[0] not in players:
-                print(line[0])
+    players = {
+        REGISTRY.resolve(normalize(v[0])) for s in participant_dict.values() for v in s
+    }
+    for player, points in results.players.items():
+        if REGISTRY.resolve(player) not in players:
+            print(f"{player}: {points}")
+
+
+def event_results(event_ids, score_dict):
+    # (event id, gameweek, player -> points) for every event of the game
+    return [
+        (event_id, event_ids[event_id]["gw_no"], REGISTRY.named(points))
+        for event_id, points in zip(event_ids, score_dict.event_points())
+    ]
 
 
-def extract_number(s):
-    num_str = "".join([char for char in s if char.isdigit()])
-    return int(num_str) if num_str else None  # Convert to int if not empty
+def read_event_ids(game, folder="."):
+    return load_fixtures(folder).game(game)
+
+
+def prefetch_games(games, folder=".", stream=False):
+    # Fetch the innings of every event across all games in one concurrent pass
+    event_ids = []
+    for game in games:
+        for event_id, e_dict in read_event_ids(game, folder=folder).items():
+            if e_dict["team_choice"] != "avg" and event_id not in event_ids:
+                event_ids.append(event_id)
+    return load_payloads(event_ids, stream=stream)
 
 
 def main(
-    doc, game, global_score_dict, update_sheet=True, folder=".", print_unsold=False
+    doc,
+    game,
+    leaderboard,
+    update_sheet=True,
+    folder=".",
+    print_unsold=False,
+    payloads=None,
+    stream=False,
+    season=None,
+    ledger=None,
+    formats=DEFAULT_FORMATS,
 ):
-    to_open = f"{folder}/ids/game{game}ids.csv"
-    with open(to_open, mode="r") as file:
-        data = csv.reader((line.split("#")[0].strip() for line in file))
-        event_ids = {}
-        for lines in data:
-            event_ids[lines[0]] = {
-                "gw_no": lines[1].strip(),
-                "team_choice": lines[2].strip() if len(lines) > 2 else "B",
-            }
+    REGISTRY.load_aliases(folder)
+    event_ids = read_event_ids(game, folder=folder)
+    if payloads is None and season is None:
+        payloads = load_payloads(
+            (e for e, d in event_ids.items() if d["team_choice"] != "avg"),
+            stream=stream,
+        )
 
-    score_dict = {}
+    score_dict = ScoreAccumulator()
     best_xi_dict = {}
     missing_set = set()
     participant_dict = {}
-    player_team_gw_dict = {}
 
-    for event_id, e_dict in event_ids.items():
-        get_data(event_id, score_dict, e_dict["team_choice"])
-        score_dict = dict(
-            sorted(score_dict.items(), key=lambda item: item[1], reverse=True)
-        )
-        for s in score_dict.keys():
-            if s not in player_team_gw_dict.keys():
-                player_team_gw_dict[s] = e_dict["gw_no"]
-        missing_set.clear()
-        get_participant_points(
-            score_dict,
-            e_dict["gw_no"],
-            participant_dict,
+    for position, (event_id, e_dict) in enumerate(event_ids.items()):
+        with METRICS.stage("scoring"):
+            if season is not None:
+                season.apply(game, position, score_dict)
+            elif stream:
+                get_data(
+                    event_id,
+                    score_dict,
+                    e_dict["team_choice"],
+                    records=payloads.get(event_id, []),
+                )
+            else:
+                get_data(
+                    event_id, score_dict, e_dict["team_choice"], payloads.get(event_id)
+                )
+        with METRICS.stage("attribution"):
+            attribute_event(score_dict, e_dict["gw_no"], participant_dict, folder)
+    if event_ids:
+        missing_set = find_missing(e_dict["gw_no"], score_dict, folder=folder)
+
+    with METRICS.stage("best_xi"):
+        get_best_xi(participant_dict, best_xi_dict)
+    with METRICS.stage("output"):
+        events = event_results(event_ids, score_dict)
+        ranked = score_dict.ranked()
+        score_dict = REGISTRY.named(ranked)
+        results = output_participant_points(
             best_xi_dict,
             missing_set,
-            player_team_gw_dict,
-            folder=folder,
+            game,
+            score_dict,
+            events,
+            REGISTRY.spellings(ranked),
         )
-
-    get_best_xi(participant_dict, best_xi_dict)
-    standings = output_participant_points(
-        best_xi_dict, missing_set, game, folder=folder
+        leaderboard.add(game, score_dict)
+
+        if print_unsold:
+            output_unsold(participant_dict, results)
+
+    own_ledger = ledger is None
+    if own_ledger:
+        ledger = StandingsLedger(f"{folder}/{LEDGER_PATH}")
+    ledger.record(game, results.standings)
+    if own_ledger:
+        ledger.save()  # Otherwise the caller saves it once its run is done
+
+    exporters = [EXPORTERS[name](folder) for name in formats]
+    if update_sheet and results.standings:
+        exporters.append(SheetsExporter(doc, ledger, folder=folder))
+    with METRICS.stage("export"):
+        export(results, exporters)
+    print(score_dict)
+    return score_dict, results
+
+
+# Shared inputs of a parallel run, set once per worker process
+worker_context = {}
+
+
+def init_worker(folder, payloads, stream, season, registry, formats=DEFAULT_FORMATS):
+    # Workers take over the parent's registry so player keys and names agree
+    # across processes
+    global REGISTRY
+    if registry is not REGISTRY:
+        REGISTRY = registry
+        roster_cache.clear()
+    worker_context.update(
+        folder=folder,
+        payloads=payloads,
+        stream=stream,
+        season=season,
+        formats=formats,
     )
 
-    for p, v in score_dict.items():
-        curr = global_score_dict.get(p, [0, 0])
-        global_score_dict[p] = [curr[0] + v, curr[1] + 1]
 
-    with open(f"{folder}/calcSheets/calcSheet{game}.csv", mode="w") as file:
-        writer = csv.writer(file)
-        for k, v in score_dict.items():
-            writer.writerow([f"{k}: {v}"])
+def run_game(game):
+    # Score one game in isolation; anything it prints comes back with the
+    # result so the parent can replay it in order
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        score_dict, results = main(
+            None,
+            game,
+            Leaderboard(),
+            update_sheet=False,
+            print_unsold=True,
+            ledger=StandingsLedger(None),
+            **worker_context,
+        )
+    return game, score_dict, results, out.getvalue()
 
-    if print_unsold:
-        output_unsold(participant_dict, game, folder=folder + "/calcSheets")
 
-    if update_sheet and standings:
-        with open(f"{folder}/points/game{game}points.csv", newline="") as f:
-            data = list(csv.reader(f))
-        print_to_sheets(doc, game, data, standings, folder=folder)
-    print(score_dict)
+def run_pool_game(game):
+    # Worker processes hand their own metrics back with each result
+    METRICS.__init__()
+    return run_game(game), METRICS.report()
 
 
-if __name__ == "__main__":
-    # Authenticate with Google Sheets API
-    creds = Credentials.from_service_account_file(
-        f"credentials.json",
-        scopes=["https://www.googleapis.com/auth/spreadsheets"],
-    )
-    client = gspread.authorize(creds)
-    SHEET_ID = "1AEn2LG9bfTAQdZonbeNe5xg6EI9LXfpf5gcVJ5yD0eM"
-    doc = client.open_by_key(SHEET_ID)
+def run_games(
+    games,
+    jobs=1,
+    folder=".",
+    payloads=None,
+    stream=False,
+    season=None,
+    formats=DEFAULT_FORMATS,
+):
+    # Fan games out over a process pool. Results come back in `games` order,
+    # so merging them in the parent matches a sequential run exactly
+    games = list(games)
+    args = (folder, payloads, stream, season, REGISTRY, formats)
+    if jobs <= 1 or len(games) <= 1:
+        init_worker(*args)
+        return [run_game(game) for game in games]
+    from concurrent.futures import ProcessPoolExecutor
+
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(games)), initializer=init_worker, initargs=args
+    ) as pool:
+        for result, report in pool.map(run_pool_game, games):
+            METRICS.merge(report)
+            results.append(result)
+    return results
+
+
+def scorecard_lines(data):
+    # The fields scoring reads, keyed by inning and player, in payload order
+    lines = {}
+    for i, inning in enumerate(data.get("innings") or []):
+        lines[(i, "teams", None)] = (
+            inning["battingTeam"]["shortName"],
+            inning["bowlingTeam"]["shortName"],
+        )
+        for bowler in inning["bowlingLine"]:
+            lines[(i, "bowler", bowler["player"]["name"])] = (
+                bowler["player"].get("position"),
+                bowler["over"],
+                bowler["maiden"],
+                bowler["run"],
+                bowler["wicket"],
+            )
+        for batsman in inning["battingLine"]:
+            lines[(i, "batsman", batsman["player"]["name"])] = (
+                batsman["player"].get("position"),
+                batsman["score"],
+                batsman["balls"],
+                batsman["s4"],
+                batsman["s6"],
+                batsman["wicketTypeName"],
+                batsman.get("wicketBowlerName"),
+                batsman.get("wicketCatchName"),
+            )
+    return lines
+
+
+def changed_players(old, new):
+    # Everyone with a new or changed line, plus the bowler and fielder named
+    # in a dismissal that changed
+    players = set()
+    for key in old.keys() | new.keys():
+        if old.get(key) == new.get(key) or key[1] == "teams":
+            continue
+        players.add(key[2])
+        if key[1] == "batsman":
+            for line in (old.get(key), new.get(key)):
+                if line is not None:
+                    players.update(name for name in line[6:] if name)
+    return players
+
+
+class LiveGame:
+    # Follows one game while its matches are on. Only unfinished events are
+    # polled; an update whose lines match the last snapshot costs nothing,
+    # otherwise scoring replays from the state saved before the first
+    # changed event and Best XIs are rebuilt only for participants whose
+    # squads moved. Sheets are pushed only when the standings change
+    def __init__(
+        self,
+        doc,
+        game,
+        ledger,
+        folder=".",
+        metrics_path=METRICS_PATH,
+        formats=DEFAULT_FORMATS,
+    ):
+        self.doc = doc
+        self.game = game
+        self.ledger = ledger
+        self.folder = folder
+        self.formats = formats
+        self.metrics_path = metrics_path  # Rewritten after every update
+        self.event_ids = read_event_ids(game, folder=folder)
+        self.order = list(self.event_ids)
+        fetched = [e for e, d in self.event_ids.items() if d["team_choice"] != "avg"]
+        self.payloads = load_payloads(fetched)
+        self.lines = {e: scorecard_lines(self.payloads[e]) for e in fetched}
+        self.final = set()
+        pack = open_pack()
+        if pack is not None:
+            self.final = {e for e in fetched if e in pack}
+            pack.close()
+
+        # snapshots[k] is (score_dict, participant_dict) as they stood before
+        # event k
+        self.snapshots = [(ScoreAccumulator(), {})]
+        self.score_dict = ScoreAccumulator()
+        self.participant_dict = {}
+        self.best_xi_dict = {}
+        self.missing_set = set()
+
+        self.interval = {}
+        self.next_poll = {}
+        now = time.time()
+        for event_id in fetched:
+            self.reschedule(event_id, True, now)
+
+    def settled(self, event_id):
+        if event_id in self.final:
+            return True
+        _, meta = read_cache(event_id)
+        return meta is not None and is_fresh(meta, 0, time.time())
+
+    def reschedule(self, event_id, changed, now):
+        if self.settled(event_id):
+            self.next_poll.pop(event_id, None)
+            return
+        if not self.payloads[event_id].get("innings"):
+            interval = LIVE_IDLE_POLL
+        elif changed:
+            interval = LIVE_POLL
+        else:
+            interval = min(self.interval.get(event_id, LIVE_POLL) * 2, LIVE_MAX_POLL)
+        self.interval[event_id] = interval
+        self.next_poll[event_id] = now + interval
+
+    def poll(self, now):
+        # Refetch the events that are due; returns whether anything changed
+        due = [e for e, t in self.next_poll.items() if t <= now]
+        if not due:
+            return False
+        first = None
+        for event_id, data in fetch_all_innings(due, ttl=0).items():
+            lines = scorecard_lines(data)
+            old = self.lines[event_id]
+            changed = lines != old or list(lines) != list(old)
+            if changed:
+                players = changed_players(old, lines)
+                print(f"Event {event_id}: {', '.join(sorted(players))}")
+                self.payloads[event_id] = data
+                self.lines[event_id] = lines
+                position = self.order.index(event_id)
+                first = position if first is None else min(first, position)
+            self.reschedule(event_id, changed, now)
+        if first is None:
+            return False
+        with METRICS.stage("live_rescore"):
+            self.rescore(first)
+        self.publish()
+        METRICS.write(self.metrics_path)
+        return True
+
+    def rescore(self, start=0):
+        # Replay events from `start` on top of the state saved before it
+        score_dict, participant_dict = copy.deepcopy(self.snapshots[start])
+        del self.snapshots[start + 1 :]
+        for position in range(start, len(self.order)):
+            if position > start:
+                self.snapshots.append(copy.deepcopy((score_dict, participant_dict)))
+            event_id = self.order[position]
+            e_dict = self.event_ids[event_id]
+            get_data(
+                event_id, score_dict, e_dict["team_choice"], self.payloads.get(event_id)
+            )
+            attribute_event(score_dict, e_dict["gw_no"], participant_dict, self.folder)
+        if self.order:
+            self.missing_set = find_missing(
+                e_dict["gw_no"], score_dict, folder=self.folder
+            )
+
+        moved = {
+            p: players
+            for p, players in participant_dict.items()
+            if players != self.participant_dict.get(p)
+        }
+        best_xi_dict = {}
+        get_best_xi(moved, best_xi_dict)
+        self.best_xi_dict = {
+            p: best_xi_dict[p] if p in moved else self.best_xi_dict[p]
+            for p in participant_dict
+        }
+        self.score_dict = score_dict
+        self.participant_dict = participant_dict
+
+    def publish(self):
+        ranked = self.score_dict.ranked()
+        results = output_participant_points(
+            self.best_xi_dict,
+            self.missing_set,
+            self.game,
+            REGISTRY.named(ranked),
+            event_results(self.event_ids, self.score_dict),
+            REGISTRY.spellings(ranked),
+        )
+        exporters = [EXPORTERS[name](self.folder) for name in self.formats]
+        publish = results.standings != self.ledger.games.get(self.game)
+        if publish:
+            self.ledger.record(self.game, results.standings)
+            publish = self.doc is not None and bool(results.standings)
+        if publish:
+            exporters.append(SheetsExporter(self.doc, self.ledger, self.folder))
+        export(results, exporters)
+        if publish:
+            self.doc.flush()
+
+    def run(self):
+        try:
+            self.rescore()
+            self.publish()
+            while self.next_poll:
+                time.sleep(max(0, min(self.next_poll.values()) - time.time()))
+                self.poll(time.time())
+        finally:
+            self.ledger.save()  # However following the game ends
+        print(f"Game {self.game}: every match is final")
 
-    global_score_dict = {}
+
+if __name__ == "__main__":
+    leaderboard = Leaderboard()
 
     parser = argparse.ArgumentParser()
 
@@ -651,63 +1438,218 @@ if __name__ == "__main__":
     parser.add_argument(
         "--pgws", action="store_true", help="Print Game Week Info (default: False)"
     )
+    parser.add_argument(
+        "--cache-ttl",
+        type=int,
+        default=CACHE_TTL,
+        help=f"Seconds before an unfinished match is refetched (default: {CACHE_TTL})",
+    )
+    parser.add_argument(
+        "--ingest",
+        action="store_true",
+        help="Pack finished scorecards in data/ before scoring (default: False)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Parse innings incrementally as they download (default: False)",
+    )
+    parser.add_argument(
+        "--vector",
+        action="store_true",
+        help="Score every game in one vectorized pass (default: False)",
+    )
+    parser.add_argument(
+        "--rules",
+        type=str,
+        default=None,
+        help="JSON file of scoring rule overrides; prints the league table under"
+        " them beside the official one and writes nothing (default: None)",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Rebuild every game in --game all, ignoring build/ (default: False)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Games scored in parallel for ranges and all (default: CPU count)",
+    )
+    parser.add_argument(
+        "--offline",
+        "--no-sheets",
+        dest="offline",
+        action="store_true",
+        help="Score from data/ only, without network or Sheets (default: False)",
+    )
+    parser.add_argument(
+        "--live",
+        action="store_true",
+        help="Keep following --game while its matches are on (default: False)",
+    )
+    parser.add_argument(
+        "--export",
+        nargs="+",
+        choices=sorted(EXPORTERS),
+        default=list(DEFAULT_FORMATS),
+        help="Local result files written for each game (default: csv db)",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=str,
+        default=METRICS_PATH,
+        help=f"Run report path, written as .json and .prom (default: {METRICS_PATH})",
+    )
     args = parser.parse_args()
+    if args.live and not str(args.game).isdigit():
+        parser.error("--live needs a single game")
+    rules = None
+    if args.rules:
+        try:
+            rules = load_rules(args.rules)
+        except (OSError, ValueError) as error:
+            parser.error(f"--rules {args.rules}: {error}")
+    # The run report is written however the run ends
+    atexit.register(METRICS.write, args.metrics)
+    OFFLINE = args.offline
+    doc = None if OFFLINE or rules is not None else open_doc()
+    ledger = StandingsLedger()
+    CACHE_TTL = args.cache_ttl
+    stream = args.stream and not args.vector  # The engine needs whole payloads
+    formats = tuple(args.export)
+    if args.ingest:
+        ingest_scorecards()
     if args.pgws:
         set_up_ids()
-    folder_path = "ids"
-    if "-" in args.game:
+    if rules is not None:
+        # A what-if run only prints; the league's own results are left alone
+        match = re.fullmatch(r"(\d+)-(\d+)", args.game)
+        if args.game.lower() == "all":
+            games = load_fixtures().game_numbers()
+        elif match:
+            games = list(range(int(match.group(1)), int(match.group(2)) + 1))
+        else:
+            games = [int(args.game) or 1]
+        compare_rules(games, rules, prefetch_games(games), label=args.rules)
+    elif args.live:
+        LiveGame(
+            doc,
+            int(args.game) or 1,
+            ledger,
+            metrics_path=args.metrics,
+            formats=formats,
+        ).run()
+    elif "-" in args.game:
         match = re.fullmatch(r"(\d+)-(\d+)", args.game)
         if match:
             n1, n2 = map(int, match.groups())  # Convert to integers
-            for i in range(n1, n2 + 1):  # Loop from n1 to n2 (inclusive)
-                main(
-                    doc,
-                    i,
-                    global_score_dict,
-                    update_sheet=True,
-                    folder=".",
-                    print_unsold=True,
-                )
-    elif args.game.lower() == "all":
-        for file_name in os.listdir(folder_path):
-            file_path = os.path.join(folder_path, file_name)
-            print(f"Game {extract_number(file_name)}")
-            main(
-                doc,
-                extract_number(file_name),
-                global_score_dict,
-                update_sheet=True,
-                folder=".",
-                print_unsold=True,
+            payloads = prefetch_games(range(n1, n2 + 1), folder=".", stream=stream)
+            season = None
+            if args.vector:
+                season = score_games(range(n1, n2 + 1), payloads=payloads)
+            results = run_games(
+                range(n1, n2 + 1),  # Loop from n1 to n2 (inclusive)
+                jobs=args.jobs,
+                payloads=payloads,
+                stream=stream,
+                season=season,
+                formats=formats,
             )
-        global_score_dict = {
-            k: [v[0], round(v[0] / v[1], 2)] for k, v in global_score_dict.items()
+            for i, score_dict, table, output in results:
+                print(output, end="")
+                leaderboard.add(i, score_dict)
+                ledger.record(i, table.standings)
+                if doc is not None and table.standings:
+                    export(table, [SheetsExporter(doc, ledger)])
+            ledger.save()
+            if doc is not None:
+                doc.flush()
+    elif args.game.lower() == "all":
+        games = load_fixtures().game_numbers()
+        payloads = prefetch_games(games, folder=".", stream=stream)
+        season = None
+        if args.vector:
+            season = score_games(games, payloads=payloads)
+        state = {} if args.full else load_state()
+        inputs = {
+            game: game_inputs(game, read_event_ids(game), payloads, folder=".")
+            for game in games
         }
-        global_score_dict = dict(
-            sorted(global_score_dict.items(), key=lambda item: item[1][0], reverse=True)
-        )
-        with open("fun.csv", mode="r") as file:
-            fun_dict = {}
-            reader = csv.reader(file)
-            for lines in reader:
-                if lines[0] in global_score_dict and int(lines[1] or 0) > 0:
-                    fun_dict[lines[0]] = round(
-                        global_score_dict[lines[0]][1]
-                        + global_score_dict[lines[0]][0] / int(lines[1]),
-                        2,
-                    )
-            fun_dict = dict(
-                sorted(fun_dict.items(), key=lambda item: item[1], reverse=True)
+        exporters = [EXPORTERS[name](".") for name in formats]
+        dirty = [
+            game
+            for game in games
+            if cached_result(
+                state, game, inputs[game], exporters, published=doc is not None
+            )
+            is None
+        ]
+        results = {
+            game: (score_dict, table, output)
+            for game, score_dict, table, output in run_games(
+                dirty,
+                jobs=args.jobs,
+                payloads=payloads,
+                stream=stream,
+                season=season,
+                formats=formats,
             )
-            # for k, v in fun_dict.items():
-            #     print(f"{k}: {v}")
-        print_player_rank_to_sheet(doc, global_score_dict, folder=".")
+        }
+        rebuilt = []
+        tables = {}
+        for game in games:
+            print(f"Game {game}")
+            if game not in results:
+                print("Unchanged, using cached results")
+                leaderboard.add(game, state[str(game)]["score_dict"])
+                ledger.record(game, state[str(game)]["standings"])
+                continue
+            score_dict, tables[game], output = results[game]
+            standings = tables[game].standings
+            print(output, end="")
+            leaderboard.add(game, score_dict)
+            ledger.record(game, standings)
+            state[str(game)] = {
+                "inputs": inputs[game],
+                "score_dict": score_dict,
+                "standings": standings,
+                "published": False,
+            }
+            if standings:
+                rebuilt.append(game)
+        ledger.save()
+        save_state(state)
+        # Publish once every game is in the ledger; tables after the earliest
+        # rebuilt game carry its points in their totals, so refresh those too
+        for game in sorted(games) if doc is not None else []:
+            if game in rebuilt:
+                export(tables[game], [SheetsExporter(doc, ledger)])
+            elif rebuilt and game > min(rebuilt):
+                with METRICS.stage("sheets_queue"):
+                    print_standings_to_sheet(doc, game, ledger, folder=".")
+        if doc is not None:
+            with METRICS.stage("sheets_queue"):
+                print_player_rank_to_sheet(doc, leaderboard, folder=".")
+            doc.flush()
+            # Only mark games published once their sheets have been written
+            for game in games:
+                state[str(game)]["published"] = True
+            save_state(state)
     else:
         main(
             doc,
             int(args.game) or 1,
-            global_score_dict,
-            update_sheet=True,
+            leaderboard,
+            update_sheet=doc is not None,
             folder=".",
             print_unsold=True,
+            stream=stream,
+            season=score_games([int(args.game) or 1]) if args.vector else None,
+            ledger=ledger,
+            formats=formats,
         )
+        ledger.save()
+        if doc is not None:
+            doc.flush()
@@ -0,0 +1,116 @@
+import contextlib
+import json
+import threading
+import time
+
+from atomic_file import atomic_open
+
+# Run-wide stage timers, counters and per-event fetch records, written out
+# as a JSON report and a Prometheus textfile when the run ends
+METRICS_PATH = "build/metrics"
+PREFIX = "cric_auc"
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.stages = {}  # stage -> [calls, seconds]
+        self.counters = {}  # (name, label value) -> count
+        self.events = {}  # event id -> fetch record
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds, calls=1):
+        with self.lock:
+            entry = self.stages.setdefault(name, [0, 0.0])
+            entry[0] += calls
+            entry[1] += seconds
+
+    def count(self, name, label=None, value=1):
+        with self.lock:
+            key = (name, label)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def event(self, event_id, **fields):
+        # Latest fetch of each event wins
+        with self.lock:
+            self.events[str(event_id)] = fields
+
+    def merge(self, report):
+        # Fold in the report of a worker process
+        for name, entry in report["stages"].items():
+            self.add_time(name, entry["seconds"], entry["calls"])
+        for name, labels in report["counters"].items():
+            for label, value in labels.items():
+                self.count(name, label or None, value)
+        for event_id, fields in report["events"].items():
+            self.event(event_id, **fields)
+
+    def report(self):
+        with self.lock:
+            counters = {}
+            for (name, label), value in sorted(
+                self.counters.items(), key=lambda item: (item[0][0], item[0][1] or "")
+            ):
+                counters.setdefault(name, {})[label or ""] = value
+            return {
+                "started": self.started,
+                "duration": time.time() - self.started,
+                "stages": {
+                    name: {"calls": calls, "seconds": seconds}
+                    for name, (calls, seconds) in sorted(self.stages.items())
+                },
+                "counters": counters,
+                "events": dict(sorted(self.events.items())),
+            }
+
+    def prometheus(self):
+        report = self.report()
+        lines = [
+            f"# TYPE {PREFIX}_run_start_timestamp_seconds gauge",
+            f"{PREFIX}_run_start_timestamp_seconds {report['started']:.3f}",
+            f"# TYPE {PREFIX}_run_duration_seconds gauge",
+            f"{PREFIX}_run_duration_seconds {report['duration']:.6f}",
+            f"# TYPE {PREFIX}_stage_seconds gauge",
+        ]
+        for name, entry in report["stages"].items():
+            lines.append(
+                f'{PREFIX}_stage_seconds{{stage="{name}"}} {entry["seconds"]:.6f}'
+            )
+        lines.append(f"# TYPE {PREFIX}_stage_calls gauge")
+        for name, entry in report["stages"].items():
+            lines.append(f'{PREFIX}_stage_calls{{stage="{name}"}} {entry["calls"]}')
+        for name, labels in report["counters"].items():
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            for label, value in labels.items():
+                selector = f'{{kind="{label}"}}' if label else ""
+                lines.append(f"{PREFIX}_{name}{selector} {value}")
+        for field in ("seconds", "bytes"):
+            lines.append(f"# TYPE {PREFIX}_fetch_{field} gauge")
+            for event_id, record in report["events"].items():
+                if field in record:
+                    lines.append(
+                        f'{PREFIX}_fetch_{field}{{event="{event_id}",'
+                        f'source="{record.get("source", "")}"}} {record[field]}'
+                    )
+        return "\n".join(lines) + "\n"
+
+    def write(self, path=METRICS_PATH):
+        # <path>.json and <path>.prom, each replaced atomically so a textfile
+        # collector never reads half a file
+        for suffix, text in (
+            (".json", json.dumps(self.report(), indent=1)),
+            (".prom", self.prometheus()),
+        ):
+            with atomic_open(f"{path}{suffix}") as file:
+                file.write(text)
+
+
+METRICS = Metrics()
@@ -0,0 +1,136 @@
+import csv
+import os
+import re
+
+# Every player a run meets gets a small integer key the first time they are
+# seen, and scoring, attribution and per-game aggregation work on those keys.
+# Scorecard lines and dismissal credits carry a SofaScore player id and are
+# matched on it; avg rows, roster entries and credits without an id only
+# carry names, which go through the alias table: every name a scorecard has
+# used for a player,
+# plus the extra spellings listed in utils/aliases.csv as
+#   roster spelling, scorecard name or SofaScore id
+# Names come back only when results are written out, along with every
+# spelling each player was met under, so tools that never read a scorecard
+# can match names the same way (results_db.load_registry).
+ALIASES_PATH = "utils/aliases.csv"
+
+
+def normalize(name):
+    # Roster spelling -> lookup form: single spaces, no (WK) suffix
+    name = re.sub(r"\s+", " ", name.strip())
+    return name[:-5] if name.endswith("(WK)") else name
+
+
+class PlayerRegistry:
+    def __init__(self):
+        self.names = []  # key -> canonical name
+        self.player_ids = []  # key -> SofaScore id, None until one is seen
+        self.ids = {}  # SofaScore id -> key
+        self.aliases = {}  # name -> key
+        self.provisional = set()  # Keys still named after an alias
+        self.alias_files = set()
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name, player_id=None):
+        key = len(self.names)
+        self.names.append(name)
+        self.player_ids.append(player_id)
+        if player_id is not None:
+            self.ids[player_id] = key
+        if name is not None:
+            self.aliases.setdefault(name, key)
+        return key
+
+    def key(self, player):
+        # Key of a scorecard "player" object. A name met before its id (a
+        # fielder credit, a roster entry) is taken over by the first id that
+        # carries it
+        player_id = player.get("id") or None
+        name = player["name"]
+        if player_id is None:
+            return self.resolve(name)
+        key = self.ids.get(player_id)
+        if key is None:
+            key = self.aliases.get(name)
+            if key is None or self.player_ids[key] is not None:
+                return self.add(name, player_id)
+            self.player_ids[key] = player_id
+            self.ids[player_id] = key
+        if key in self.provisional:
+            self.provisional.discard(key)
+            self.names[key] = name
+        self.aliases.setdefault(name, key)
+        return key
+
+    def credit(self, batsman, field):
+        # Key of the player a dismissal credits, field "wicketBowler" or
+        # "wicketCatch"; None when the line names nobody there
+        name = batsman.get(f"{field}Name")
+        if name is None:
+            return None
+        player = batsman.get(field) or {}
+        return self.key({"id": player.get("id"), "name": name})
+
+    def resolve(self, name):
+        # Key for a bare name, registering it if nobody has used it yet
+        if name is None:
+            return None
+        key = self.aliases.get(name)
+        if key is None:
+            key = self.add(name)
+        return key
+
+    def find(self, name):
+        # Key of a name someone has already used, ignoring case when the
+        # exact spelling is unknown; None when nobody has
+        name = normalize(name)
+        if name in self.aliases:
+            return self.aliases[name]
+        folded = name.casefold()
+        for alias, key in self.aliases.items():
+            if alias.casefold() == folded:
+                return key
+        return None
+
+    def name(self, key):
+        return self.names[key]
+
+    def spellings(self, keys):
+        # (name, canonical name, SofaScore id) for every name these keys
+        # have been met under
+        keys = set(keys)
+        return [
+            (name, self.names[key], self.player_ids[key])
+            for name, key in self.aliases.items()
+            if key in keys
+        ]
+
+    def named(self, score_dict):
+        # key -> points back to name -> points, keeping the order
+        return {self.names[key]: points for key, points in score_dict.items()}
+
+    def load_aliases(self, folder="."):
+        # Read utils/aliases.csv once per folder; it is optional
+        path = f"{folder}/{ALIASES_PATH}"
+        if path in self.alias_files:
+            return
+        self.alias_files.add(path)
+        if not os.path.exists(path):
+            return
+        with open(path, mode="r", newline="") as file:
+            for line in csv.reader(file):
+                if len(line) < 2 or line[0].strip().startswith("#"):
+                    continue
+                alias, target = normalize(line[0]), line[1].strip()
+                if target.isdigit():
+                    key = self.ids.get(int(target))
+                    if key is None:
+                        # Named properly once the id turns up in a scorecard
+                        key = self.add(alias, int(target))
+                        self.provisional.add(key)
+                else:
+                    key = self.resolve(normalize(target))
+                self.aliases[alias] = key
@@ -0,0 +1,275 @@
+import argparse
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from fixture_index import load_fixtures
+from results_db import (
+    BUSY_TIMEOUT,
+    DB_PATH,
+    add_db_argument,
+    load_registry,
+    participant_leaderboard,
+    require_db,
+)
+from simulation import add_run_arguments, run
+
+# Plays out the rest of the season many times to see who is likely to win
+# the league. The games still to come are the fixture index's games after
+# the last one in the results database (or after --after, projecting from
+# an earlier point and ignoring later results). Each is played by the
+# teams file of its latest gameweek, or by the newest teams file when its
+# gameweek has none yet. Every rostered player's game is a draw from their
+# own games so far: each scored game since their first, where missing a
+# game means they do not play. Roster names are matched to scored players
+# by results_db's registry, as auction_sim.py matches sheet names. Each
+# participant's Best XI is then picked the way get_best_xi picks it and
+# added to their league total. Seasons run as NumPy arrays in batches of
+# BATCH, spread over a process pool.
+BATCH = 4096
+OUTFIELD = 10  # Best XI places besides the WK
+ROLE_CAP = 5  # Most batsmen, and most bowlers, in a Best XI
+TOP = 3
+
+
+class Lineup:
+    # One teams file as player numbers per participant and role, padded
+    # with `absent`, a player who never plays; players maps registry keys
+    # to player numbers
+    def __init__(self, roster, players, participants, absent, registry):
+        pools = {p: {"wk": [], "bat": [], "bowl": [], "ar": []} for p in participants}
+        kinds = {"batsmen": "bat", "bowlers": "bowl", "all-rounders": "ar"}
+        for entries in roster.values():
+            for entry in entries:
+                player = players.get(registry.find(entry["name"]), absent)
+                if entry["participant"] not in pools:
+                    continue
+                if entry["wk"]:
+                    kind = "wk"
+                elif entry["role"] in kinds:
+                    kind = kinds[entry["role"]]
+                else:
+                    continue
+                pools[entry["participant"]][kind].append(player)
+        for kind in ["wk", "bat", "bowl", "ar"]:
+            # Every pool is at least OUTFIELD wide, so prefix sums always
+            # reach the largest pick
+            width = max([OUTFIELD] + [len(pool[kind]) for pool in pools.values()])
+            rows = [
+                pool[kind] + [absent] * (width - len(pool[kind]))
+                for pool in pools.values()
+            ]
+            setattr(self, kind, np.array(rows, dtype=np.intp))
+
+
+class Season:
+    # Everything a simulated season needs, as plain arrays
+    def __init__(self, participants, totals, history, lengths, lineups):
+        self.participants = participants
+        self.totals = np.asarray(totals, dtype=float)  # League points so far
+        # (players, games) points per game since each player's first, NaN
+        # for a game missed; the last player has no games and never plays
+        self.history = history
+        self.lengths = np.maximum(lengths, 1)  # Games each player draws from
+        self.lineups = lineups  # One Lineup per remaining game
+
+
+def ranked_pool(points):
+    # (participants, sims) players available and (participants, OUTFIELD + 1,
+    # sims) points of the best n of them for every n, best first
+    ranked = -np.sort(-points, axis=1)  # NaN, not playing, sorts last
+    available = np.sum(~np.isnan(points), axis=1)
+    sums = np.zeros((points.shape[0], OUTFIELD + 1, points.shape[2]))
+    np.cumsum(np.nan_to_num(ranked[:, :OUTFIELD]), axis=1, out=sums[:, 1:])
+    return available, sums
+
+
+def best_xi(wk, bat, bowl, ar):
+    # (participants, sims) Best XI totals from each participant's
+    # (participants, players, sims) points per role, NaN for not playing;
+    # every pool at least OUTFIELD wide. As in get_best_xi and top_counts:
+    # the best WK keeps gloves and spare WKs bat, then up to ROLE_CAP
+    # batsmen and bowlers with all-rounders filling the OUTFIELD places
+    # left, most players first and then most points
+    wks = wk.copy()
+    gloves = np.argmax(np.where(np.isnan(wks), -np.inf, wks), axis=1)[:, None]
+    wk_points = np.take_along_axis(wks, gloves, axis=1)[:, 0]
+    np.put_along_axis(wks, gloves, np.nan, axis=1)
+
+    n_bat, bat = ranked_pool(np.concatenate([bat, wks], axis=1))
+    n_bowl, bowl = ranked_pool(bowl)
+    n_ar, ar = ranked_pool(ar)
+
+    # Places and all-rounder points once b + w batsmen and bowlers are in
+    fill = [np.minimum(OUTFIELD - n, n_ar) for n in range(2 * ROLE_CAP + 1)]
+    fill_points = [np.take_along_axis(ar, a[:, None], axis=1)[:, 0] for a in fill]
+    best_count = np.full(n_bat.shape, -1)
+    best = np.zeros(n_bat.shape)
+    for b in range(ROLE_CAP + 1):
+        for w in range(ROLE_CAP + 1):
+            count = b + w + fill[b + w]
+            total = bat[:, b] + bowl[:, w] + fill_points[b + w]
+            better = (b <= n_bat) & (w <= n_bowl)
+            better &= (count > best_count) | ((count == best_count) & (total > best))
+            best_count = np.where(better, count, best_count)
+            best = np.where(better, total, best)
+    return best + np.nan_to_num(wk_points)
+
+
+def xi_points(points, lineup):
+    # Best XI totals for one game, given every player's (players, sims)
+    # points
+    return best_xi(
+        points[lineup.wk], points[lineup.bat], points[lineup.bowl], points[lineup.ar]
+    )
+
+
+def simulate(season, sims, top=TOP, seed=None):
+    # Per participant: [sum and sum of squares of final totals, wins (tied
+    # wins shared), finishes in the top `top`, sum of finishing places]
+    rng = np.random.default_rng(seed)
+    stats = np.zeros((len(season.participants), 5))
+    players = np.arange(len(season.history))[:, None]
+    for start in range(0, sims, BATCH):
+        size = min(BATCH, sims - start)
+        final = np.repeat(season.totals[:, None], size, axis=1)
+        for lineup in season.lineups:
+            draws = rng.random((len(players), size)) * season.lengths[:, None]
+            final += xi_points(season.history[players, draws.astype(np.intp)], lineup)
+        place = 1 + np.sum(final[:, None, :] > final[None, :, :], axis=0)
+        winners = place == 1
+        stats[:, 0] += final.sum(axis=1)
+        stats[:, 1] += (final**2).sum(axis=1)
+        stats[:, 2] += (winners / winners.sum(axis=0)).sum(axis=1)
+        stats[:, 3] += (place <= top).sum(axis=1)
+        stats[:, 4] += place.sum(axis=1)
+    return stats
+
+
+def latest_roster(gws, folder="."):
+    # The teams file of the latest of these gameweeks that has one, else
+    # the newest teams file there is
+    from main import load_roster  # Only the teams file parser, when needed
+
+    numbers = sorted((int(gw) for gw in gws if str(gw).isdigit()), reverse=True)
+    if os.path.isdir(f"{folder}/teams"):
+        numbers += sorted(
+            (
+                int(name[2:-9])
+                for name in os.listdir(f"{folder}/teams")
+                if name.startswith("gw")
+                and name.endswith("teams.csv")
+                and name[2:-9].isdigit()
+            ),
+            reverse=True,
+        )[:1]
+    for gw in numbers:
+        roster = load_roster(gw, folder=folder)
+        if roster is not None:
+            return roster
+    return {}
+
+
+def load_season(after=None, db_path=DB_PATH, folder="."):
+    # The season as it stands after game `after` (the last scored game by
+    # default) and the games left to play; None when there are none
+    db = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT)
+    registry = load_registry(db, folder)
+    scored = [game for (game,) in db.execute("SELECT game FROM games ORDER BY game")]
+    if after is None:
+        after = max(scored, default=0)
+    played = [game for game in scored if game <= after]
+    standings = participant_leaderboard(db, after) if played else []
+    games = {}
+    for game, player, points in db.execute(
+        "SELECT game, player, points FROM player_points WHERE game <= ?", (after,)
+    ):
+        games.setdefault(registry.find(player), {})[game] = points
+    db.close()
+
+    index = load_fixtures(folder)
+    remaining = [game for game in index.game_numbers() if game > after]
+    if not remaining:
+        return None, after, remaining
+    rosters = [
+        latest_roster({row["gw_no"] for row in index.game(game).values()}, folder)
+        for game in remaining
+    ]
+
+    players = {key: i for i, key in enumerate(games)}
+    history = np.full((len(games) + 1, max(len(played), 1)), np.nan)
+    lengths = np.zeros(len(games) + 1, dtype=np.intp)
+    for key, points in games.items():
+        since = [game for game in played if game >= min(points)]
+        history[players[key], : len(since)] = [
+            points.get(game, np.nan) for game in since
+        ]
+        lengths[players[key]] = len(since)
+    participants = [participant for _, participant, _ in standings]
+    for roster in rosters:
+        for entries in roster.values():
+            for entry in entries:
+                if entry["participant"] not in participants:
+                    participants.append(entry["participant"])
+    totals = {participant: total for _, participant, total in standings}
+    lineups = {}
+    for roster in rosters:
+        if id(roster) not in lineups:
+            lineups[id(roster)] = Lineup(
+                roster, players, participants, len(games), registry
+            )
+    season = Season(
+        participants,
+        [totals.get(p, 0) for p in participants],
+        history,
+        lengths,
+        [lineups[id(roster)] for roster in rosters],
+    )
+    return season, after, remaining
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sims", type=int, default=100000, help="Seasons simulated (default: 100000)"
+    )
+    parser.add_argument(
+        "--top", type=int, default=TOP, help=f"Places counted as top (default: {TOP})"
+    )
+    parser.add_argument(
+        "--after",
+        type=int,
+        default=None,
+        help="Project from this game on, ignoring later results (default: last scored)",
+    )
+    add_run_arguments(parser)
+    add_db_argument(parser)
+    args = parser.parse_args()
+    require_db(parser, args.db)
+    season, after, remaining = load_season(args.after, args.db)
+    if season is None:
+        parser.exit(0, f"No games left to play after game {after}\n")
+    start = time.perf_counter()
+    stats = run(
+        simulate, season, args.sims, args.top, jobs=max(1, args.jobs), seed=args.seed
+    )
+    seconds = time.perf_counter() - start
+
+    print(
+        f"{args.sims} seasons, games {remaining[0]}-{remaining[-1]} to play,"
+        f" {len(season.participants)} participants in {seconds:.2f} s"
+    )
+    print("\nPROJECTED STANDINGS:")
+    n = args.sims
+    order = np.lexsort((-stats[:, 0], -stats[:, 2]))
+    for rank, i in enumerate(order, 1):
+        total, squares, wins, top, place = stats[i]
+        mean = total / n
+        spread = np.sqrt(max(squares / n - mean**2, 0))
+        print(
+            f"{rank}) {season.participants[i]}: {mean:.0f} ± {spread:.0f}"
+            f" (now {season.totals[i]:.0f}), wins {100 * wins / n:.1f}%,"
+            f" top {args.top} {100 * top / n:.1f}%, avg. place {place / n:.2f}"
+        )
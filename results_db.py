@@ -0,0 +1,365 @@
+import argparse
+import os
+import re
+import sqlite3
+import time
+
+from player_registry import PlayerRegistry
+
+# Every game a run scores is also written to a local SQLite database: the
+# points each player earned in each event, players' totals for the game,
+# participants' game totals and Best XIs. Re-scoring a game replaces its
+# rows. Lookups by player and participant are indexed, so season questions
+# are answered from here instead of by re-scoring; run this file to ask
+# them (leaderboard, player, participant, h2h).
+DB_PATH = "points/results.sqlite"
+BUSY_TIMEOUT = 30  # Seconds to wait while another process is writing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game INTEGER PRIMARY KEY,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS event_points (
+    game INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    event_id TEXT NOT NULL,
+    gw_no TEXT NOT NULL,
+    player TEXT NOT NULL COLLATE NOCASE,
+    points INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS event_points_game ON event_points (game, position);
+CREATE INDEX IF NOT EXISTS event_points_player ON event_points (player, game);
+CREATE TABLE IF NOT EXISTS player_points (
+    game INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
+    player TEXT NOT NULL COLLATE NOCASE,
+    points INTEGER NOT NULL,
+    PRIMARY KEY (game, rank)
+);
+CREATE INDEX IF NOT EXISTS player_points_player ON player_points (player, game);
+CREATE TABLE IF NOT EXISTS participant_points (
+    game INTEGER NOT NULL,
+    participant TEXT NOT NULL COLLATE NOCASE,
+    rank INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    PRIMARY KEY (game, participant)
+);
+CREATE INDEX IF NOT EXISTS participant_points_participant
+    ON participant_points (participant, game);
+CREATE TABLE IF NOT EXISTS best_xi (
+    game INTEGER NOT NULL,
+    participant TEXT NOT NULL COLLATE NOCASE,
+    slot INTEGER NOT NULL,
+    player TEXT NOT NULL COLLATE NOCASE,
+    tags TEXT NOT NULL,
+    points INTEGER NOT NULL,
+    PRIMARY KEY (game, participant, slot)
+);
+CREATE INDEX IF NOT EXISTS best_xi_player ON best_xi (player, game);
+CREATE TABLE IF NOT EXISTS player_names (
+    game INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    player TEXT NOT NULL COLLATE NOCASE,
+    player_id INTEGER,
+    PRIMARY KEY (game, name)
+);
+"""
+GAME_TABLES = [
+    "games",
+    "event_points",
+    "player_points",
+    "participant_points",
+    "best_xi",
+    "player_names",
+]
+
+# "Name (C) (WK)" -> "Name", "(C) (WK)"
+TAGGED = re.compile(r"(.*?)((?: \((?:C|VC|WK)\))*)")
+
+
+def connect(path=DB_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    db = sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+    db.execute("PRAGMA journal_mode=WAL")  # Readers never wait on a run
+    db.execute("PRAGMA synchronous=NORMAL")  # Fsync at checkpoints only; safe with WAL
+    db.executescript(SCHEMA)
+    return db
+
+
+def add_db_argument(parser):
+    parser.add_argument(
+        "--db", type=str, default=DB_PATH, help=f"Results database (default: {DB_PATH})"
+    )
+
+
+def require_db(parser, path):
+    # The read-side tools have nothing to work on before a run has scored
+    if not os.path.exists(path):
+        parser.exit(1, f"{path} not found; score some games first\n")
+
+
+def plain(value):
+    # NumPy scalars from the vectorized engine -> Python numbers
+    return value.item() if hasattr(value, "item") else value
+
+
+def record_game(db, table):
+    game = table.game
+    with db:
+        for name in GAME_TABLES:
+            db.execute(f"DELETE FROM {name} WHERE game = ?", (game,))
+        db.execute("INSERT INTO games VALUES (?, ?)", (game, time.time()))
+        db.executemany(
+            "INSERT INTO event_points VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (game, position, event_id, gw_no, player, plain(points))
+                for position, (event_id, gw_no, players) in enumerate(table.events)
+                for player, points in players.items()
+            ),
+        )
+        db.executemany(
+            "INSERT INTO player_points VALUES (?, ?, ?, ?)",
+            (
+                (game, rank, player, plain(points))
+                for rank, (player, points) in enumerate(table.players.items(), 1)
+            ),
+        )
+        db.executemany(
+            "INSERT INTO participant_points VALUES (?, ?, ?, ?)",
+            (
+                (game, participant, rank, plain(points))
+                for rank, (participant, points) in enumerate(table.standings.items(), 1)
+            ),
+        )
+        db.executemany(
+            "INSERT INTO best_xi VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (game, participant, slot, *TAGGED.fullmatch(player).groups())
+                + (plain(points),)
+                for participant, best_xi in table.best_xis.items()
+                for slot, (player, points) in enumerate(best_xi, 1)
+                if player != "N/A"
+            ),
+        )
+        db.executemany(
+            "INSERT INTO player_names VALUES (?, ?, ?, ?)",
+            ((game, *spelling) for spelling in table.names),
+        )
+
+
+class DatabaseExporter:
+    # points/results.sqlite, one transaction per game
+    def __init__(self, folder="."):
+        self.path = f"{folder}/{DB_PATH}"
+
+    def export(self, table):
+        db = connect(self.path)
+        try:
+            record_game(db, table)
+        finally:
+            db.close()
+
+    def exported(self, game):
+        if not os.path.exists(self.path):
+            return False
+        db = connect(self.path)
+        try:
+            row = db.execute("SELECT 1 FROM games WHERE game = ?", (game,)).fetchone()
+        finally:
+            db.close()
+        return row is not None
+
+
+def player_leaderboard(db, top=20, game=None):
+    # (rank, player, points, avg. points, games), over the season or one game
+    if game is not None:
+        return db.execute(
+            "SELECT rank, player, points, points, 1 FROM player_points"
+            " WHERE game = ? ORDER BY rank LIMIT ?",
+            (game, top),
+        ).fetchall()
+    rows = db.execute(
+        "SELECT player, SUM(points) AS total, ROUND(AVG(points), 2), COUNT(*)"
+        " FROM player_points GROUP BY player ORDER BY total DESC LIMIT ?",
+        (top,),
+    ).fetchall()
+    return [(rank, *row) for rank, row in enumerate(rows, 1)]
+
+
+def participant_leaderboard(db, game=None):
+    # (rank, participant, total) after `game`, or after the last one
+    rows = db.execute(
+        "SELECT participant, SUM(points) AS total FROM participant_points"
+        " WHERE ?1 IS NULL OR game <= ?1 GROUP BY participant ORDER BY total DESC",
+        (game,),
+    ).fetchall()
+    return [(rank, *row) for rank, row in enumerate(rows, 1)]
+
+
+def player_totals(db):
+    # player -> season points, for every player with a scored game
+    return dict(
+        db.execute("SELECT player, SUM(points) FROM player_points GROUP BY player")
+    )
+
+
+def load_registry(db, folder="."):
+    # A registry of every player the database has scored, under each name
+    # scoring met them by and the extra spellings in utils/aliases.csv, for
+    # matching roster and auction-sheet names to scored players
+    registry = PlayerRegistry()
+    for name, player, player_id in db.execute(
+        "SELECT name, player, player_id FROM player_names ORDER BY game"
+    ):
+        key = registry.key({"id": player_id, "name": player})
+        registry.aliases.setdefault(name, key)
+    for (player,) in db.execute("SELECT DISTINCT player FROM player_points"):
+        registry.resolve(player)  # Scored before names were recorded
+    registry.load_aliases(folder)
+    return registry
+
+
+def player_history(db, player):
+    # (game, points, rank, Best XIs picked in) per game
+    return db.execute(
+        "SELECT p.game, p.points, p.rank,"
+        " (SELECT COUNT(*) FROM best_xi x WHERE x.player = p.player"
+        "  AND x.game = p.game)"
+        " FROM player_points p WHERE p.player = ? ORDER BY p.game",
+        (player,),
+    ).fetchall()
+
+
+def player_events(db, player):
+    # (game, gameweek, event id, points) per event the player scored in
+    return db.execute(
+        "SELECT game, gw_no, event_id, points FROM event_points"
+        " WHERE player = ? ORDER BY game, position",
+        (player,),
+    ).fetchall()
+
+
+def participant_history(db, participant):
+    # (game, points, rank, running total) per game
+    return db.execute(
+        "SELECT game, points, rank, SUM(points) OVER (ORDER BY game)"
+        " FROM participant_points WHERE participant = ? ORDER BY game",
+        (participant,),
+    ).fetchall()
+
+
+def best_xi(db, participant, game):
+    # (player, tags, points) in team-sheet order
+    return db.execute(
+        "SELECT player, tags, points FROM best_xi"
+        " WHERE participant = ? AND game = ? ORDER BY slot",
+        (participant, game),
+    ).fetchall()
+
+
+def head_to_head(db, a, b, players=False):
+    # (game, a's points, b's points) for the games both appear in
+    table, column = (
+        ("player_points", "player")
+        if players
+        else ("participant_points", "participant")
+    )
+    return db.execute(
+        f"SELECT a.game, a.points, b.points FROM {table} a"
+        f" JOIN {table} b ON b.game = a.game AND b.{column} = ?"
+        f" WHERE a.{column} = ? ORDER BY a.game",
+        (b, a),
+    ).fetchall()
+
+
+def print_leaderboard(db, args):
+    if args.participants:
+        for rank, participant, total in participant_leaderboard(db, args.game):
+            print(f"{rank}) {participant}: {total}")
+        return
+    for rank, player, points, avg, games in player_leaderboard(db, args.top, args.game):
+        if args.game is not None:
+            print(f"{rank}) {player}: {points}")
+        else:
+            print(f"{rank}) {player}: {points} ({avg} avg. over {games})")
+
+
+def print_player(db, args):
+    history = player_history(db, args.name)
+    if not history:
+        print(f"No games for {args.name}")
+        return
+    for game, points, rank, picked in history:
+        print(f"Game {game}: {points} (#{rank}, in {picked} Best XIs)")
+    if args.events:
+        print("\nEVENTS:")
+        for game, gw_no, event_id, points in player_events(db, args.name):
+            print(f"Game {game} GW {gw_no} {event_id}: {points}")
+
+
+def print_participant(db, args):
+    if args.game is not None:
+        for player, tags, points in best_xi(db, args.name, args.game):
+            print(f"{player}{tags}: {points}")
+        return
+    history = participant_history(db, args.name)
+    if not history:
+        print(f"No games for {args.name}")
+    for game, points, rank, total in history:
+        print(f"Game {game}: {points} (#{rank}), total {total}")
+
+
+def print_head_to_head(db, args):
+    wins = [0, 0]
+    for game, a, b in head_to_head(db, args.a, args.b, players=args.players):
+        if a != b:
+            wins[a < b] += 1
+        print(f"Game {game}: {a} - {b}")
+    print(f"{args.a} {wins[0]} - {wins[1]} {args.b}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    add_db_argument(parser)
+    commands = parser.add_subparsers(dest="command", required=True)
+    leaderboard_parser = commands.add_parser(
+        "leaderboard", help="Top players, or participants, over the season"
+    )
+    leaderboard_parser.add_argument(
+        "--game", type=int, default=None, help="Only this game, or up to it"
+    )
+    leaderboard_parser.add_argument(
+        "--top", type=int, default=20, help="Players listed (default: 20)"
+    )
+    leaderboard_parser.add_argument(
+        "--participants", action="store_true", help="Rank participants instead"
+    )
+    player_parser = commands.add_parser("player", help="A player's points per game")
+    player_parser.add_argument("name", type=str)
+    player_parser.add_argument(
+        "--events", action="store_true", help="Also list points per event"
+    )
+    participant_parser = commands.add_parser(
+        "participant", help="A participant's points per game, or one Best XI"
+    )
+    participant_parser.add_argument("name", type=str)
+    participant_parser.add_argument(
+        "--game", type=int, default=None, help="Show this game's Best XI"
+    )
+    h2h_parser = commands.add_parser("h2h", help="Two participants game by game")
+    h2h_parser.add_argument("a", type=str)
+    h2h_parser.add_argument("b", type=str)
+    h2h_parser.add_argument(
+        "--players", action="store_true", help="Compare two players instead"
+    )
+    args = parser.parse_args()
+    require_db(parser, args.db)
+    db = sqlite3.connect(args.db, timeout=BUSY_TIMEOUT)
+    {
+        "leaderboard": print_leaderboard,
+        "player": print_player,
+        "participant": print_participant,
+        "h2h": print_head_to_head,
+    }[args.command](db, args)
+    db.close()
@@ -0,0 +1,132 @@
+import csv
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from atomic_file import atomic_open
+from results_db import DatabaseExporter
+
+# One game's results as scoring left them: every player's points in rank
+# order, each participant's Best XI and the standings. Exporters are handed
+# the table itself, so nothing is read back from a file that was only just
+# written, and a game's outputs are written side by side.
+POINTS_PATH = "points/game{game}points.csv"
+CALC_PATH = "calcSheets/calcSheet{game}.csv"
+JSON_PATH = "results/game{game}.json"
+TEAMS_PER_ROW = 4
+XI_SIZE = 11
+
+
+class ResultsTable:
+    def __init__(self, game, players, best_xis, events=None, names=None):
+        self.game = game
+        self.players = players  # Player -> points, best first
+        self.best_xis = best_xis  # Participant -> [(player, points)] * 11
+        # (event id, gameweek, player -> points earned) in processing order
+        self.events = events or []
+        # (spelling, player, SofaScore id or None) for every name the
+        # players were met under
+        self.names = names or []
+        # Participant -> points, best first; ties keep Best XI order
+        totals = {p: sum(int(v) for _, v in xi) for p, xi in best_xis.items()}
+        self.standings = dict(
+            sorted(totals.items(), key=lambda item: item[1], reverse=True)
+        )
+
+    def points_rows(self):
+        # Best XIs side by side, TEAMS_PER_ROW participants to a block: the
+        # participant and total, their 11 players, then a blank row
+        rows = []
+        teams = list(self.best_xis.items())
+        for i in range(0, len(teams), TEAMS_PER_ROW):
+            chunk = teams[i : i + TEAMS_PER_ROW]
+            row = []
+            for team, best_xi in chunk:
+                row.extend([team, sum(int(v) for _, v in best_xi), ""])
+            rows.append(row)
+            for n in range(XI_SIZE):
+                row = []
+                for _, best_xi in chunk:
+                    player, points = best_xi[n] if n < len(best_xi) else ("N/A", 0)
+                    row.extend([player, points, ""])
+                rows.append(row)
+            rows.append([])
+        return rows
+
+    def calc_rows(self):
+        return [[f"{player}: {points}"] for player, points in self.players.items()]
+
+    def sheet_range(self):
+        # The points grid as the game's worksheet takes it below the league
+        # table, cells as text the way the CSV reads back
+        return "B15", [[str(cell) for cell in row] for row in self.points_rows()]
+
+    def to_json(self):
+        return {
+            "game": self.game,
+            "standings": self.standings,
+            "best_xis": {
+                p: [list(line) for line in xi] for p, xi in self.best_xis.items()
+            },
+            "players": self.players,
+            "events": [
+                {"event_id": e, "gw_no": gw_no, "players": points}
+                for e, gw_no, points in self.events
+            ],
+        }
+
+
+def write_rows(path, rows):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, mode="w", newline="") as file:
+        csv.writer(file).writerows(rows)
+
+
+class CsvExporter:
+    # points/game{N}points.csv and calcSheets/calcSheet{N}.csv
+    def __init__(self, folder="."):
+        self.folder = folder
+
+    def export(self, table):
+        write_rows(
+            f"{self.folder}/{POINTS_PATH.format(game=table.game)}", table.points_rows()
+        )
+        write_rows(
+            f"{self.folder}/{CALC_PATH.format(game=table.game)}", table.calc_rows()
+        )
+
+    def exported(self, game):
+        return all(
+            os.path.exists(f"{self.folder}/{path.format(game=game)}")
+            for path in (POINTS_PATH, CALC_PATH)
+        )
+
+
+class JsonExporter:
+    # results/game{N}.json, everything in the table
+    def __init__(self, folder="."):
+        self.folder = folder
+
+    def export(self, table):
+        path = f"{self.folder}/{JSON_PATH.format(game=table.game)}"
+        with atomic_open(path) as file:
+            json.dump(table.to_json(), file, default=int)
+
+    def exported(self, game):
+        return os.path.exists(f"{self.folder}/{JSON_PATH.format(game=game)}")
+
+
+EXPORTERS = {"csv": CsvExporter, "json": JsonExporter, "db": DatabaseExporter}
+DEFAULT_FORMATS = ("csv", "db")
+
+
+def export(table, exporters):
+    # Run every exporter on the table, concurrently when there are several
+    exporters = list(exporters)
+    if len(exporters) <= 1:
+        for exporter in exporters:
+            exporter.export(table)
+        return
+    with ThreadPoolExecutor(max_workers=len(exporters)) as executor:
+        for future in [executor.submit(e.export, table) for e in exporters]:
+            future.result()
@@ -0,0 +1,123 @@
+# Running player points for one game, indexed by player registry key. Points
+# and first-seen gameweeks live in flat lists, and each event only touches
+# the players it credits: end_event() stamps newcomers with the gameweek and
+# logs the scores that moved. Ranking is left to output time, where one sort
+# gives the order the game used to get by re-sorting after every event.
+ABSENT = float("inf")
+
+
+class ScoreAccumulator:
+    __slots__ = ("points", "first_gw", "order", "touched", "new", "events")
+
+    def __init__(self):
+        self.points = []  # key -> points, None until the player is seen
+        self.first_gw = []  # key -> gameweek of the player's first event
+        self.order = []  # Keys in first-seen order
+        self.touched = {}  # key -> points, for the event in progress
+        self.new = []  # Keys first seen in the event in progress
+        self.events = []  # Per finished event, the points it left changed
+
+    def __len__(self):
+        return len(self.order)
+
+    def __iter__(self):
+        return iter(self.order)
+
+    # Scoring calls these once per credit, so they stay flat
+    def __contains__(self, key):
+        points = self.points
+        return key < len(points) and points[key] is not None
+
+    def __getitem__(self, key):
+        points = self.points
+        value = points[key] if key < len(points) else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        points = self.points
+        value = points[key] if key < len(points) else None
+        return default if value is None else value
+
+    def __setitem__(self, key, value):
+        points = self.points
+        if key >= len(points):
+            grow = key + 1 - len(points)
+            points.extend([None] * grow)
+            self.first_gw.extend([None] * grow)
+        if points[key] is None:
+            self.order.append(key)
+            self.new.append(key)
+        points[key] = value
+        self.touched[key] = value
+
+    def add(self, key, value, base=0):
+        # points[key] += value, starting from `base` for a new player
+        points = self.points
+        if key >= len(points):
+            self[key] = base + value
+            return
+        current = points[key]
+        if current is None:
+            self.order.append(key)
+            self.new.append(key)
+            current = base
+        points[key] = self.touched[key] = current + value
+
+    def items(self):
+        return ((key, self.points[key]) for key in self.order)
+
+    def end_event(self, gw_no):
+        # Close the event: returns the players it introduced, in the order
+        # they were first credited
+        new, self.new = self.new, []
+        for key in new:
+            self.first_gw[key] = gw_no
+        self.events.append(self.touched)
+        self.touched = {}
+        return new
+
+    def ranked(self):
+        # key -> points, best first. Re-sorting after every event was a
+        # stable sort of the previous order with newcomers at the end, so a
+        # player ranks on their points after each event, latest first,
+        # then on when they were first seen
+        sort_keys = {key: [] for key in self.order}
+        current = {}
+        for changed in self.events:
+            current.update(changed)
+            for key, value in current.items():
+                sort_keys[key].append(-value)
+        n_events = len(self.events)
+        for position, key in enumerate(self.order):
+            seen = sort_keys[key]
+            seen.reverse()
+            seen.extend([ABSENT] * (n_events - len(seen)))
+            seen.append(position)
+        return {
+            key: self.points[key]
+            for key in sorted(self.order, key=sort_keys.__getitem__)
+        }
+
+    def event_points(self):
+        # Per finished event, key -> the points it earned the player
+        current = {}
+        deltas = []
+        for changed in self.events:
+            deltas.append({k: v - current.get(k, 0) for k, v in changed.items()})
+            current.update(changed)
+        return deltas
+
+    def copy(self):
+        other = ScoreAccumulator()
+        other.points = list(self.points)
+        other.first_gw = list(self.first_gw)
+        other.order = list(self.order)
+        other.touched = dict(self.touched)
+        other.new = list(self.new)
+        other.events = list(self.events)  # Finished events are never changed
+        return other
+
+    def __deepcopy__(self, memo):
+        return self.copy()
@@ -0,0 +1,245 @@
+import mmap
+import struct
+
+from atomic_file import atomic_open
+
+# Packed season file: only the innings fields that scoring reads, stored as
+# fixed-width little-endian records plus one shared string table.
+#
+#   header   magic, version, string/event/innings/batting/bowling counts
+#   strings  u32 offsets[n + 1] followed by the utf-8 blob
+#   events   event id, first innings, innings count, mtime (ns) of the
+#            JSON scorecard it was packed from
+#   innings  batting team, bowling team, batting slice, bowling slice
+#   batting  name, player id, position, runs, balls, 4s, 6s, wicket type,
+#            wicket bowler name and id, wicket catcher name and id
+#   bowling  name, player id, position, overs (tenths), maidens, runs, wickets
+MAGIC = b"CSCP"
+VERSION = 3
+NONE = 0xFFFFFFFF
+
+HEADER = struct.Struct("<4sHIIIII")
+EVENT = struct.Struct("<QIIQ")
+INNING = struct.Struct("<IIIIII")
+BATTING = struct.Struct("<IIIHHHHIIIII")
+BOWLING = struct.Struct("<IIIHHHH")
+
+
+class StringTable:
+    def __init__(self):
+        self.index = {}
+        self.strings = []
+
+    def add(self, text):
+        if text is None:
+            return NONE
+        if text not in self.index:
+            self.index[text] = len(self.strings)
+            self.strings.append(text)
+        return self.index[text]
+
+    def to_bytes(self):
+        encoded = [text.encode("utf-8") for text in self.strings]
+        offsets = [0]
+        for blob in encoded:
+            offsets.append(offsets[-1] + len(blob))
+        return struct.pack(f"<{len(offsets)}I", *offsets) + b"".join(encoded)
+
+
+def write_pack(payloads, path, mtimes=None):
+    # payloads maps event id -> SofaScore /innings payload, mtimes event id ->
+    # the mtime of the file it came from
+    mtimes = mtimes or {}
+    strings = StringTable()
+    events, innings, batting, bowling = [], [], [], []
+    for event_id, data in sorted(payloads.items(), key=lambda item: int(item[0])):
+        event_innings = data.get("innings") or []
+        events.append(
+            EVENT.pack(
+                int(event_id),
+                len(innings),
+                len(event_innings),
+                mtimes.get(event_id, 0),
+            )
+        )
+        for inning in event_innings:
+            innings.append(
+                INNING.pack(
+                    strings.add(inning["battingTeam"]["shortName"]),
+                    strings.add(inning["bowlingTeam"]["shortName"]),
+                    len(batting),
+                    len(inning["battingLine"]),
+                    len(bowling),
+                    len(inning["bowlingLine"]),
+                )
+            )
+            for batsman in inning["battingLine"]:
+                batting.append(
+                    BATTING.pack(
+                        strings.add(batsman["player"]["name"]),
+                        batsman["player"].get("id", 0),
+                        strings.add(batsman["player"].get("position")),
+                        batsman["score"],
+                        batsman["balls"],
+                        batsman["s4"],
+                        batsman["s6"],
+                        strings.add(batsman["wicketTypeName"]),
+                        strings.add(batsman.get("wicketBowlerName")),
+                        (batsman.get("wicketBowler") or {}).get("id", 0),
+                        strings.add(batsman.get("wicketCatchName")),
+                        (batsman.get("wicketCatch") or {}).get("id", 0),
+                    )
+                )
+            for bowler in inning["bowlingLine"]:
+                bowling.append(
+                    BOWLING.pack(
+                        strings.add(bowler["player"]["name"]),
+                        bowler["player"].get("id", 0),
+                        strings.add(bowler["player"].get("position")),
+                        round(bowler["over"] * 10),
+                        bowler["maiden"],
+                        bowler["run"],
+                        bowler["wicket"],
+                    )
+                )
+
+    with atomic_open(path, "wb") as file:
+        file.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                len(strings.strings),
+                len(events),
+                len(innings),
+                len(batting),
+                len(bowling),
+            )
+        )
+        file.write(strings.to_bytes())
+        for records in (events, innings, batting, bowling):
+            file.write(b"".join(records))
+
+
+class ScorecardPack:
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_strings, n_events, n_innings, n_batting, n_bowling = (
+            HEADER.unpack_from(self.buffer, 0)
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} scorecard pack")
+
+        offset = HEADER.size
+        self.string_offsets = struct.unpack_from(
+            f"<{n_strings + 1}I", self.buffer, offset
+        )
+        self.strings_start = offset + 4 * (n_strings + 1)
+        self.strings = [None] * n_strings
+
+        offset = self.strings_start + self.string_offsets[-1]
+        self.events = {}
+        for event_id, first, count, mtime in EVENT.iter_unpack(
+            self.buffer[offset : offset + EVENT.size * n_events]
+        ):
+            self.events[event_id] = (first, count, mtime)
+        self.innings_start = offset + EVENT.size * n_events
+        self.batting_start = self.innings_start + INNING.size * n_innings
+        self.bowling_start = self.batting_start + BATTING.size * n_batting
+
+    def __contains__(self, event_id):
+        return int(event_id) in self.events
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def mtime(self, event_id):
+        return self.events[int(event_id)][2]
+
+    def string(self, index):
+        if index == NONE:
+            return None
+        if self.strings[index] is None:
+            start = self.strings_start + self.string_offsets[index]
+            end = self.strings_start + self.string_offsets[index + 1]
+            self.strings[index] = self.buffer[start:end].decode("utf-8")
+        return self.strings[index]
+
+    def batsman(self, index):
+        (
+            name,
+            pid,
+            position,
+            runs,
+            balls,
+            s4,
+            s6,
+            wicket,
+            bowler,
+            bowler_id,
+            catcher,
+            catcher_id,
+        ) = BATTING.unpack_from(self.buffer, self.batting_start + BATTING.size * index)
+        batsman = {
+            "player": {
+                "name": self.string(name),
+                "id": pid,
+                "position": self.string(position),
+            },
+            "score": runs,
+            "balls": balls,
+            "s4": s4,
+            "s6": s6,
+            "wicketTypeName": self.string(wicket),
+        }
+        if bowler != NONE:
+            batsman["wicketBowlerName"] = self.string(bowler)
+        if bowler_id:
+            batsman["wicketBowler"] = {"id": bowler_id}
+        if catcher != NONE:
+            batsman["wicketCatchName"] = self.string(catcher)
+        if catcher_id:
+            batsman["wicketCatch"] = {"id": catcher_id}
+        return batsman
+
+    def bowler(self, index):
+        name, pid, position, tenths, maidens, runs, wickets = BOWLING.unpack_from(
+            self.buffer, self.bowling_start + BOWLING.size * index
+        )
+        return {
+            "player": {
+                "name": self.string(name),
+                "id": pid,
+                "position": self.string(position),
+            },
+            "over": tenths // 10 if tenths % 10 == 0 else tenths / 10,
+            "maiden": maidens,
+            "run": runs,
+            "wicket": wickets,
+        }
+
+    def payload(self, event_id):
+        # Rebuild the subset of the SofaScore payload that compute_innings reads
+        first, count, _ = self.events[int(event_id)]
+        innings = []
+        for i in range(first, first + count):
+            bat_team, bowl_team, bat_start, bat_count, bowl_start, bowl_count = (
+                INNING.unpack_from(self.buffer, self.innings_start + INNING.size * i)
+            )
+            innings.append(
+                {
+                    "battingTeam": {"shortName": self.string(bat_team)},
+                    "bowlingTeam": {"shortName": self.string(bowl_team)},
+                    "bowlingLine": [
+                        self.bowler(j)
+                        for j in range(bowl_start, bowl_start + bowl_count)
+                    ],
+                    "battingLine": [
+                        self.batsman(j) for j in range(bat_start, bat_start + bat_count)
+                    ],
+                }
+            )
+        return {"innings": innings}
+
+    def close(self):
+        self.buffer.close()
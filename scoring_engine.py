@@ -0,0 +1,346 @@
+import numpy as np
+
+from scoring_rules import DEFAULT_RULES
+
+# Batch scoring for a whole range of games at once. Every batting, bowling
+# and fielding credit becomes one row in a set of parallel arrays; the
+# bracketed bonuses are binned lookups and fielding credits are grouped
+# reductions. The rules come from scoring_rules, as they do for the scalar
+# functions in main.py, which remain the reference.
+
+CHOICES = {None: 0, "batting": 1, "bowling": 2}
+NOT_OUT, OTHER, BOWLED, CAUGHT, STUMPED, RUN_OUT = range(6)
+WICKET_TYPES = {
+    "Not out": NOT_OUT,
+    "Bowled": BOWLED,
+    "LBW": BOWLED,
+    "Caught": CAUGHT,
+    "Caught & Bowled": CAUGHT,
+    "Stumped": STUMPED,
+    "Run out": RUN_OUT,
+}
+
+
+def bracket(values, rules, name):
+    edges = np.asarray(rules[f"{name}_edges"])
+    return np.asarray(rules[f"{name}_points"])[np.digitize(values, edges)]
+
+
+class SeasonLines:
+    # Columnar store of every line in a range of games. Players are keyed
+    # per game on their player registry key, events are columns in
+    # processing order and seq orders every credit the way the scalar path
+    # applies them.
+    def __init__(self, registry):
+        self.registry = registry
+        self.key_index = {}
+        self.key_game, self.key_player = [], []
+        self.columns = []  # (game, event id) in processing order
+        self.event_start, self.event_end = [], []  # seq span of each column
+        self.seq = 0
+        self.batting = {k: [] for k in BATTING_FIELDS}
+        self.bowling = {k: [] for k in BOWLING_FIELDS}
+        self.sets = {k: [] for k in ("key", "col", "seq", "value")}
+        self.cache = {}
+
+    def key(self, game, player):
+        if player is None:
+            return -1
+        if (game, player) not in self.key_index:
+            self.key_index[(game, player)] = len(self.key_player)
+            self.key_game.append(game)
+            self.key_player.append(player)
+        return self.key_index[(game, player)]
+
+    def add_event(self, game, event_id, team_choice, data=None, avg_rows=None):
+        col = len(self.columns)
+        self.columns.append((game, event_id))
+        start = self.seq
+        registry = self.registry
+        for name, value in avg_rows or []:
+            self.append(
+                self.sets,
+                key=self.key(game, registry.resolve(name)),
+                col=col,
+                value=value,
+            )
+
+        for inning in (data or {}).get("innings") or []:
+            if inning["battingTeam"]["shortName"] == team_choice:
+                choice = "batting"
+            elif inning["bowlingTeam"]["shortName"] == team_choice:
+                choice = "bowling"
+            else:
+                choice = None
+            for bowler in inning["bowlingLine"]:
+                self.append(
+                    self.bowling,
+                    key=self.key(game, registry.key(bowler["player"])),
+                    col=col,
+                    choice=CHOICES[choice],
+                    overs=bowler["over"],
+                    maiden=bowler["maiden"],
+                    run=bowler["run"],
+                    wicket=bowler["wicket"],
+                )
+            for batsman in inning["battingLine"]:
+                self.append(
+                    self.batting,
+                    key=self.key(game, registry.key(batsman["player"])),
+                    col=col,
+                    choice=CHOICES[choice],
+                    runs=batsman["score"],
+                    balls=batsman["balls"],
+                    s4=batsman["s4"],
+                    s6=batsman["s6"],
+                    bowler_position=batsman["player"]["position"] == "B",
+                    wicket=WICKET_TYPES.get(batsman["wicketTypeName"], OTHER),
+                    bowler=self.key(game, registry.credit(batsman, "wicketBowler")),
+                    catcher=self.key(game, registry.credit(batsman, "wicketCatch")),
+                )
+                self.seq += 1  # Room for the dismissal credit right after
+        self.event_start.append(start)
+        self.event_end.append(self.seq)
+        self.seq += self.seq - start  # Room for the catch credits
+
+    def append(self, table, **row):
+        row["seq"] = self.seq
+        self.seq += 1
+        for k, v in row.items():
+            table[k].append(v)
+
+    def arrays(self, table, fields):
+        # Converted once and reused by every rescore until more events land
+        cached = self.cache.get(id(table))
+        if cached is None or len(cached["seq"]) != len(table["seq"]):
+            cached = {
+                k: np.asarray(table[k], dtype=dtype) for k, dtype in fields.items()
+            }
+            self.cache[id(table)] = cached
+        return cached
+
+
+BATTING_FIELDS = {
+    "key": np.int64,
+    "col": np.int64,
+    "seq": np.int64,
+    "choice": np.int8,
+    "runs": np.int64,
+    "balls": np.int64,
+    "s4": np.int64,
+    "s6": np.int64,
+    "bowler_position": bool,
+    "wicket": np.int8,
+    "bowler": np.int64,
+    "catcher": np.int64,
+}
+BOWLING_FIELDS = {
+    "key": np.int64,
+    "col": np.int64,
+    "seq": np.int64,
+    "choice": np.int8,
+    "overs": np.float64,
+    "maiden": np.int64,
+    "run": np.int64,
+    "wicket": np.int64,
+}
+SET_FIELDS = {"key": np.int64, "col": np.int64, "seq": np.int64, "value": np.int64}
+
+
+def batting_points(bat, rules):
+    runs, balls = bat["runs"], bat["balls"]
+    sr = np.where(balls == 0, 100.0, runs * 100 / np.maximum(balls, 1))
+    counts = ~bat["bowler_position"]
+    sr_bonus = np.where(
+        counts & (balls >= rules["strike_rate_min_balls"]),
+        bracket(sr, rules, "strike_rate"),
+        0,
+    )
+    duck = np.where(
+        counts & (runs == 0) & (bat["wicket"] != NOT_OUT) & (balls > 0),
+        rules["duck"],
+        0,
+    )
+    return (
+        runs * rules["run"]
+        + bat["s4"] * rules["four"]
+        + bat["s6"] * rules["six"]
+        + sr_bonus
+        + duck
+        + bracket(runs, rules, "run_bonus")
+    )
+
+
+def convert_overs(overs):
+    return np.trunc(overs) + np.round(np.mod(overs, 1) * 10) / 6
+
+
+def bowling_points(bowl, rules):
+    overs = bowl["overs"]
+    economy = np.where(
+        overs > 0, bowl["run"] / np.where(overs > 0, convert_overs(overs), 1), 8
+    )
+    economy_score = np.where(
+        overs >= rules["economy_min_overs"], bracket(economy, rules, "economy"), 0
+    )
+    wicket_bonus = np.asarray(rules["wicket_bonus"])
+    return (
+        bowl["wicket"] * rules["wicket"]
+        + bowl["maiden"] * rules["maiden"]
+        + economy_score
+        + wicket_bonus[np.minimum(bowl["wicket"], len(wicket_bonus) - 1)]
+    )
+
+
+def credits(lines, rules):
+    # Every scoring credit as (key, col, seq, base, points); base is what a
+    # player starts on when this credit is the first time they are seen
+    bat = lines.arrays(lines.batting, BATTING_FIELDS)
+    bowl = lines.arrays(lines.bowling, BOWLING_FIELDS)
+    event_start = np.asarray(lines.event_start, dtype=np.int64)
+    event_end = np.asarray(lines.event_end, dtype=np.int64)
+    parts = []
+
+    appearance = rules["appearance"]
+    parts.append(
+        (
+            bowl["key"],
+            bowl["col"],
+            bowl["seq"],
+            appearance,
+            bowling_points(bowl, rules),
+            bowl["choice"] != CHOICES["batting"],
+        )
+    )
+    parts.append(
+        (
+            bat["key"],
+            bat["col"],
+            bat["seq"],
+            appearance,
+            batting_points(bat, rules),
+            bat["choice"] != CHOICES["bowling"],
+        )
+    )
+
+    fields = bat["choice"] != CHOICES["batting"]
+    for wicket, who, base, points in (
+        (BOWLED, "bowler", appearance, rules["bowled_lbw"]),
+        (STUMPED, "catcher", appearance, rules["stumping"]),
+        (RUN_OUT, "catcher", rules["run_out_appearance"], rules["run_out"]),
+    ):
+        mask = fields & (bat["wicket"] == wicket) & (bat[who] >= 0)
+        parts.append((bat[who], bat["col"], bat["seq"] + 1, base, points, mask))
+
+    # Catches: count per (event, fielder), credited once at the end of the
+    # event in the order each fielder took their first catch
+    caught = fields & (bat["wicket"] == CAUGHT) & (bat["catcher"] >= 0)
+    n_keys = max(len(lines.key_player), 1)
+    groups, inverse, counts = np.unique(
+        bat["col"][caught] * n_keys + bat["catcher"][caught],
+        return_inverse=True,
+        return_counts=True,
+    )
+    first = np.full(len(groups), np.iinfo(np.int64).max)
+    np.minimum.at(first, inverse, bat["seq"][caught])
+    group_col = groups // n_keys
+    parts.append(
+        (
+            groups % n_keys,
+            group_col,
+            event_end[group_col] + first - event_start[group_col],
+            appearance,
+            rules["catch"] * counts
+            + np.where(counts >= rules["catch_bonus_min"], rules["catch_bonus"], 0),
+            np.ones(len(groups), dtype=bool),
+        )
+    )
+
+    keys, cols, seqs, bases, points = [], [], [], [], []
+    for key, col, seq, base, pts, mask in parts:
+        keys.append(key[mask])
+        cols.append(col[mask])
+        seqs.append(seq[mask])
+        bases.append(np.broadcast_to(base, len(key))[mask])
+        points.append(np.broadcast_to(pts, len(key))[mask])
+    return tuple(np.concatenate(part) for part in (keys, cols, seqs, bases, points))
+
+
+class SeasonScores:
+    def __init__(self, lines, rules=None):
+        self.lines = lines
+        self.rules = DEFAULT_RULES if rules is None else rules
+        n_keys, n_cols = len(lines.key_player), len(lines.columns)
+        key, col, seq, base, points = credits(lines, self.rules)
+        sets = lines.arrays(lines.sets, SET_FIELDS)
+
+        # First appearance of every player, from a credit or an avg row
+        first_seq = np.full(n_keys, np.iinfo(np.int64).max)
+        np.minimum.at(first_seq, key, seq)
+        np.minimum.at(first_seq, sets["key"], sets["seq"])
+        self.first_seq = first_seq
+        first_credit = np.zeros(len(key), dtype=bool)
+        first_credit[np.flatnonzero(seq == first_seq[key])] = True
+
+        cells = n_keys * n_cols
+        flat = key * n_cols + col
+        gained = np.bincount(flat, weights=points, minlength=cells)
+        gained += np.bincount(
+            flat[first_credit], weights=base[first_credit], minlength=cells
+        )
+        seen = np.bincount(flat, minlength=cells) > 0
+        gained = gained.reshape(n_keys, n_cols)
+        seen = seen.reshape(n_keys, n_cols)
+
+        # avg rows overwrite the running total; the last row of an event wins
+        set_value = np.full((n_keys, n_cols), np.nan)
+        order = np.argsort(sets["seq"], kind="stable")
+        set_value[sets["key"][order], sets["col"][order]] = sets["value"][order]
+        is_set = ~np.isnan(set_value)
+        # Players each event credits or sets, 0-point appearances included
+        self.touched = seen | is_set
+
+        # Running totals after each event, one column at a time
+        self.history = np.full((n_keys, n_cols), np.nan)
+        total = np.zeros(n_keys)
+        present = np.zeros(n_keys, dtype=bool)
+        for c in range(n_cols):
+            total = np.where(is_set[:, c], set_value[:, c], total + gained[:, c])
+            present |= seen[:, c] | is_set[:, c]
+            self.history[present, c] = total[present]
+
+        self.game_keys, self.game_cols = {}, {}
+        for k, game in enumerate(lines.key_game):
+            self.game_keys.setdefault(game, []).append(k)
+        for c, (game, _) in enumerate(lines.columns):
+            self.game_cols.setdefault(game, []).append(c)
+
+    def apply(self, game, position, score_dict):
+        # Bring score_dict to where the scalar path has it after the
+        # game's event at `position`: update the players the event touched
+        # in place and append new ones in the order they were first credited
+        col = self.game_cols[game][position]
+        keys = [k for k in self.game_keys.get(game, []) if self.touched[k, col]]
+        new = []
+        for k in keys:
+            player = self.lines.key_player[k]
+            if player in score_dict:
+                score_dict[player] = int(self.history[k, col])
+            else:
+                new.append(k)
+        for k in sorted(new, key=lambda k: self.first_seq[k]):
+            score_dict[self.lines.key_player[k]] = int(self.history[k, col])
+        return score_dict
+
+    def rescore(self, rules):
+        # Same raw stat lines, different rules: nothing is re-read or re-parsed
+        return SeasonScores(self.lines, rules)
+
+
+def score_season(events, registry, rules=None):
+    # events: (game, event id, team choice, payload, avg rows) in the order
+    # main() processes them; players are keyed through `registry`
+    lines = SeasonLines(registry)
+    for game, event_id, team_choice, data, avg_rows in events:
+        lines.add_event(game, event_id, team_choice, data, avg_rows)
+    return SeasonScores(lines, rules)
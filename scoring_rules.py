@@ -0,0 +1,77 @@
+import json
+from bisect import bisect_right
+
+# Every constant the scoring rules use, read by both the scalar scoring in
+# main.py and the vectorized engine. Brackets are [lower, upper): a value
+# scores the points after the last edge it reaches. wicket_bonus is indexed
+# by wickets (capped at its last entry). Variants only need to override
+# what changes.
+DEFAULT_RULES = {
+    "appearance": 4,
+    "run": 1,
+    "four": 1,
+    "six": 2,
+    "strike_rate_min_balls": 10,
+    "strike_rate_edges": [50, 60, 70, 130, 150, 170],
+    "strike_rate_points": [-6, -4, -2, 0, 2, 4, 6],
+    "duck": -2,
+    "run_bonus_edges": [30, 50, 100],
+    "run_bonus_points": [0, 4, 8, 16],
+    "wicket": 25,
+    "maiden": 12,
+    "economy_min_overs": 2,
+    "economy_edges": [5, 6, 7, 10, 11, 12],
+    "economy_points": [6, 4, 2, 0, -2, -4, -6],
+    "wicket_bonus": [0, 0, 0, 4, 8, 16],
+    "bowled_lbw": 8,
+    "catch": 8,
+    "catch_bonus_min": 3,
+    "catch_bonus": 4,
+    "stumping": 12,
+    "run_out": 6,
+    "run_out_appearance": 6,
+}
+BRACKETS = ["strike_rate", "run_bonus", "economy"]
+
+
+def bracket_points(value, rules, name):
+    return rules[f"{name}_points"][bisect_right(rules[f"{name}_edges"], value)]
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def load_rules(path):
+    # DEFAULT_RULES with the overrides in a JSON file; raises ValueError
+    # (or OSError) with a readable message when the file cannot be used
+    with open(path, "r") as file:
+        try:
+            overrides = json.load(file)
+        except ValueError as error:
+            raise ValueError(f"not valid JSON ({error})") from error
+    if not isinstance(overrides, dict):
+        raise ValueError("expected an object of rule names to values")
+    unknown = set(overrides) - set(DEFAULT_RULES)
+    if unknown:
+        raise ValueError(f"unknown scoring rules: {', '.join(sorted(unknown))}")
+    rules = {**DEFAULT_RULES, **overrides}
+    for name, default in DEFAULT_RULES.items():
+        value = rules[name]
+        if isinstance(default, list):
+            if not value or not isinstance(value, list):
+                raise ValueError(f"{name} must be a non-empty list")
+            if not all(is_number(v) for v in value):
+                raise ValueError(f"{name} must hold numbers only")
+        elif not is_number(value):
+            raise ValueError(f"{name} must be a number")
+    for name in BRACKETS:
+        edges, points = rules[f"{name}_edges"], rules[f"{name}_points"]
+        if edges != sorted(edges):
+            raise ValueError(f"{name}_edges must be in ascending order")
+        if len(points) != len(edges) + 1:
+            raise ValueError(
+                f"{name}_points needs one more entry than {name}_edges"
+                f" ({len(edges) + 1}, not {len(points)})"
+            )
+    return rules
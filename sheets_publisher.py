@@ -0,0 +1,176 @@
+from gspread.utils import a1_range_to_grid_range, a1_to_rowcol
+
+from metrics import METRICS
+
+# Everything a run publishes is queued locally and sent as one
+# spreadsheets.batchUpdate on flush(). The only read is the document's
+# sheet list, fetched once when the publisher is made.
+
+
+def cell_value(value):
+    if value is None or value == "":
+        return {}
+    if isinstance(value, bool):
+        return {"userEnteredValue": {"boolValue": value}}
+    if isinstance(value, (int, float)):
+        return {"userEnteredValue": {"numberValue": value}}
+    return {"userEnteredValue": {"stringValue": str(value)}}
+
+
+def displayed(value):
+    # What the Sheets UI shows for a RAW write of `value`
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class QueuedSheet:
+    def __init__(self, publisher, sheet_id, title):
+        self.publisher = publisher
+        self.id = sheet_id
+        self.title = title
+
+    def update(self, values, range_name="A1"):
+        row, col = a1_to_rowcol(range_name)
+        rows = [{"values": [cell_value(v) for v in line]} for line in values]
+        self.publisher.queue(
+            {
+                "updateCells": {
+                    "start": {
+                        "sheetId": self.id,
+                        "rowIndex": row - 1,
+                        "columnIndex": col - 1,
+                    },
+                    "rows": rows,
+                    "fields": "userEnteredValue",
+                }
+            }
+        )
+
+    def format(self, range_name, cell_format):
+        self.publisher.queue(
+            {
+                "repeatCell": {
+                    "range": a1_range_to_grid_range(range_name, self.id),
+                    "cell": {"userEnteredFormat": cell_format.to_props()},
+                    "fields": ",".join(
+                        cell_format.affected_fields("userEnteredFormat")
+                    ),
+                }
+            }
+        )
+
+
+class SheetsPublisher:
+    # Stands in for a gspread Spreadsheet in print_to_sheets and friends
+    def __init__(self, doc):
+        self.doc = doc
+        self.requests = []
+        with METRICS.stage("sheets_get"):
+            metadata = doc.fetch_sheet_metadata()
+        self.sheets = [
+            QueuedSheet(self, s["properties"]["sheetId"], s["properties"]["title"])
+            for s in sorted(metadata["sheets"], key=lambda s: s["properties"]["index"])
+        ]
+
+    def worksheets(self):
+        return list(self.sheets)
+
+    def get_worksheet(self, index):
+        return self.sheets[index]
+
+    def add_worksheet(self, title, rows, cols):
+        sheet_id = max((sheet.id for sheet in self.sheets), default=-1) + 1
+        self.queue(
+            {
+                "addSheet": {
+                    "properties": {
+                        "sheetId": sheet_id,
+                        "title": title,
+                        "gridProperties": {
+                            "rowCount": int(rows),
+                            "columnCount": int(cols),
+                        },
+                    }
+                }
+            }
+        )
+        sheet = QueuedSheet(self, sheet_id, title)
+        self.sheets.append(sheet)
+        return sheet
+
+    def queue(self, request):
+        self.requests.append(request)
+
+    def flush(self):
+        if not self.requests:
+            return None
+        requests, self.requests = self.requests, []
+        METRICS.count("sheets_requests", value=len(requests))
+        with METRICS.stage("sheets_batch_update"):
+            return self.doc.batch_update({"requests": requests})
+
+
+class LocalSpreadsheet:
+    # In-process stand-in for the two Sheets API calls SheetsPublisher
+    # makes, counting round trips so batching can be checked offline
+    def __init__(self, titles=()):
+        self.sheets = []
+        self.calls = []
+        for title in titles:
+            self.add_sheet({"title": title})
+
+    def add_sheet(self, properties):
+        sheet_id = properties.get(
+            "sheetId", max((s["sheetId"] for s in self.sheets), default=-1) + 1
+        )
+        self.sheets.append(
+            {
+                "sheetId": sheet_id,
+                "title": properties["title"],
+                "grid": {},
+                "formats": [],
+            }
+        )
+
+    def sheet(self, sheet_id):
+        return next(s for s in self.sheets if s["sheetId"] == sheet_id)
+
+    def fetch_sheet_metadata(self, params=None):
+        self.calls.append("get")
+        return {
+            "sheets": [
+                {
+                    "properties": {
+                        "sheetId": s["sheetId"],
+                        "title": s["title"],
+                        "index": i,
+                    }
+                }
+                for i, s in enumerate(self.sheets)
+            ]
+        }
+
+    def batch_update(self, body):
+        self.calls.append("batchUpdate")
+        for request in body["requests"]:
+            ((kind, args),) = request.items()
+            if kind == "addSheet":
+                self.add_sheet(args["properties"])
+            elif kind == "updateCells":
+                start = args["start"]
+                grid = self.sheet(start["sheetId"])["grid"]
+                for i, line in enumerate(args["rows"]):
+                    for j, cell in enumerate(line["values"]):
+                        value = cell.get("userEnteredValue", {})
+                        value = next(iter(value.values()), "")
+                        grid[(start["rowIndex"] + i, start["columnIndex"] + j)] = (
+                            displayed(value)
+                        )
+            elif kind == "repeatCell":
+                self.sheet(args["range"]["sheetId"])["formats"].append(args)
+        return {"replies": [{} for _ in body["requests"]]}
@@ -0,0 +1,33 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Runs a Monte Carlo simulation over a process pool, as auction_sim.py and
+# projection.py both do: the simulations are split evenly, every process
+# draws from its own stream spawned from the one seed, and the stats each
+# hands back are summed.
+
+
+def add_run_arguments(parser):
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processes to spread them over (default: CPU count)",
+    )
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+
+
+def run(simulate, model, sims, *args, jobs=1, seed=None):
+    # simulate(model, sims, *args, seed) for `sims` simulations in all
+    chunks = [sims // jobs + (i < sims % jobs) for i in range(jobs)]
+    seeds = np.random.SeedSequence(seed).spawn(jobs)
+    chunks = [(c, s) for c, s in zip(chunks, seeds) if c]
+    if len(chunks) <= 1:
+        return simulate(model, sims, *args, seeds[0])
+    with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+        counts, streams = zip(*chunks)
+        shared = [[arg] * len(chunks) for arg in args]
+        results = pool.map(simulate, [model] * len(chunks), counts, *shared, streams)
+        return sum(results)
@@ -0,0 +1,72 @@
+import json
+import os
+
+from atomic_file import atomic_open
+
+# Per-game participant points, kept on disk so league tables are built
+# locally instead of being read back from the previous game's worksheet.
+# Games can be recorded in any order; re-recording a game replaces it.
+# Nothing is written until save(), once per run. A ledger with no path
+# lives in memory only.
+LEDGER_PATH = "points/standings.json"
+
+
+class StandingsLedger:
+    def __init__(self, path=LEDGER_PATH):
+        self.path = path
+        self.games = {}
+        self.participants = []  # First-seen order, the tie-break for game 1
+        if path is not None and os.path.exists(path):
+            with open(path, "r") as file:
+                saved = json.load(file)
+            self.games = {int(g): points for g, points in saved["games"].items()}
+            self.participants = saved["participants"]
+        self.totals = {p: 0 for p in self.participants}
+        for points in self.games.values():
+            for p, v in points.items():
+                self.totals[p] += v
+
+    def record(self, game, standings):
+        for p, v in self.games.get(game, {}).items():
+            self.totals[p] -= v
+        for p, v in standings.items():
+            if p not in self.totals:
+                self.participants.append(p)
+                self.totals[p] = 0
+            self.totals[p] += v
+        self.games[game] = dict(standings)
+
+    def save(self):
+        if self.path is None:
+            return
+        with atomic_open(self.path) as file:
+            json.dump(
+                {
+                    "participants": self.participants,
+                    "games": {str(g): points for g, points in sorted(self.games.items())},
+                },
+                file,
+            )
+
+    def points(self, game, participant):
+        return self.games.get(game, {}).get(participant, 0)
+
+    def table(self, game):
+        # Rank, Team, Game 1..game, TOTAL, as shown on the game's worksheet.
+        # Each table is the previous one re-sorted by total, so ties keep
+        # the order they had the game before
+        order = list(self.participants)
+        running = dict.fromkeys(order, 0)
+        for g in range(1, game + 1):
+            for p in order:
+                running[p] += self.points(g, p)
+            order.sort(key=running.__getitem__, reverse=True)
+        rows = [["Rank", "Team"] + [f"Game {g}" for g in range(1, game + 1)]]
+        rows[0].append("TOTAL")
+        for rank, p in enumerate(order, start=1):
+            rows.append(
+                [rank, p]
+                + [self.points(g, p) for g in range(1, game + 1)]
+                + [running[p]]
+            )
+        return rows
@@ -0,0 +1,188 @@
+import json
+from email.utils import formatdate
+
+import httpx
+import pytest
+
+import fetch_scheduler
+import main
+from fetch_scheduler import (
+    BACKOFF,
+    MAX_BACKOFF,
+    CircuitBreaker,
+    FetchFailed,
+    FetchScheduler,
+    TokenBucket,
+    retry_after,
+)
+
+URL = "https://api.example/innings"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Jitter:
+    # Stands in for `random`, recording the range every backoff draws from
+    def __init__(self):
+        self.ranges = []
+
+    def uniform(self, low, high):
+        self.ranges.append((low, high))
+        return high
+
+
+@pytest.fixture(autouse=True)
+def fresh_hosts():
+    fetch_scheduler.hosts.clear()
+    yield
+    fetch_scheduler.hosts.clear()
+
+
+def scheduler(responses, **kwargs):
+    # A FetchScheduler over a transport that answers from `responses` in
+    # turn; each is a Response or an exception to raise
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        response = responses[min(len(requests), len(responses)) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    sleeps = []
+    fetcher = FetchScheduler(
+        httpx.Client(transport=httpx.MockTransport(handler)),
+        sleep=sleeps.append,
+        **kwargs,
+    )
+    return fetcher, requests, sleeps
+
+
+@pytest.mark.parametrize("status", [429, 500, 502, 503, 504])
+def test_retryable_statuses_back_off_with_jitter(status):
+    jitter = Jitter()
+    fetcher, requests, sleeps = scheduler(
+        [httpx.Response(status)] * 3 + [httpx.Response(200, json={})], rng=jitter
+    )
+    assert fetcher.get(URL).status_code == 200
+    assert len(requests) == 4
+    assert jitter.ranges == [
+        (0, min(MAX_BACKOFF, BACKOFF * 2**attempt)) for attempt in range(3)
+    ]
+    assert sleeps == [high for _, high in jitter.ranges]
+
+
+def test_last_response_once_retries_run_out():
+    fetcher, requests, _ = scheduler([httpx.Response(503)], retries=2, rng=Jitter())
+    assert fetcher.get(URL).status_code == 503
+    assert len(requests) == 3
+
+
+def test_retry_after_seconds_replaces_jitter():
+    jitter = Jitter()
+    fetcher, _, sleeps = scheduler(
+        [httpx.Response(429, headers={"Retry-After": "7"}), httpx.Response(200)],
+        rng=jitter,
+    )
+    assert fetcher.get(URL).status_code == 200
+    assert sleeps == [7]
+    assert jitter.ranges == []
+
+
+def test_retry_after_http_date():
+    now = 1_700_000_000
+    date = formatdate(now + 12, usegmt=True)
+    response = httpx.Response(503, headers={"Retry-After": date})
+    assert retry_after(response, now) == 12
+    late = httpx.Response(503, headers={"Retry-After": formatdate(now + 999)})
+    assert retry_after(late, now) == MAX_BACKOFF
+    past = httpx.Response(503, headers={"Retry-After": formatdate(now - 60)})
+    assert retry_after(past, now) == 0
+    assert retry_after(httpx.Response(503, headers={"Retry-After": "soon"})) is None
+
+
+def garbled():
+    # A raw stream, so the body is only decoded when the client reads it
+    stream = httpx.ByteStream(b"not gzip")
+    return httpx.Response(200, headers={"Content-Encoding": "gzip"}, stream=stream)
+
+
+def test_undecodable_body_is_retried_then_fails():
+    fetcher, requests, _ = scheduler(
+        [garbled(), httpx.Response(200, json={"ok": 1})], rng=Jitter()
+    )
+    assert fetcher.get(URL).json() == {"ok": 1}
+    assert len(requests) == 2
+
+    fetcher, requests, _ = scheduler([garbled(), garbled()], retries=1, rng=Jitter())
+    with pytest.raises(FetchFailed):
+        fetcher.get(URL)
+    assert len(requests) == 2
+
+
+def test_blocked_is_not_retried():
+    fetcher, requests, sleeps = scheduler([httpx.Response(403)], rng=Jitter())
+    assert fetcher.get(URL).status_code == 403
+    assert len(requests) == 1
+    assert sleeps == []
+    _, breaker = fetch_scheduler.host_state(URL)
+    assert breaker.failures == 1
+
+
+def test_breaker_opens_then_half_opens():
+    clock = Clock()
+    breaker = CircuitBreaker(threshold=3, cooldown=60, clock=clock)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.failure()
+    assert not breaker.allow()
+
+    clock.now = 59
+    assert not breaker.allow()
+    clock.now = 60
+    assert breaker.allow()  # The one trial request
+    assert not breaker.allow()
+    breaker.failure()  # Trial failed: open for another cooldown
+    assert not breaker.allow()
+
+    clock.now = 120
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.allow() and breaker.allow()
+
+
+def test_open_breaker_fails_fast():
+    fetcher, requests, _ = scheduler([httpx.ConnectError("down")], rng=Jitter())
+    fetch_scheduler.hosts["api.example"] = (
+        TokenBucket(),
+        CircuitBreaker(threshold=2, clock=Clock()),
+    )
+    with pytest.raises(FetchFailed):
+        fetcher.get(URL)
+    assert len(requests) == 2  # The breaker opened before the retries ran out
+
+
+def test_token_bucket_spaces_requests_past_the_burst():
+    clock = Clock()
+    bucket = TokenBucket(rate=4, burst=2, clock=clock)
+    assert [bucket.reserve() for _ in range(4)] == [0, 0, 0.25, 0.5]
+    clock.now = 10
+    assert bucket.reserve() == 0
+
+
+def test_fetch_failed_falls_back_to_the_cache(tmp_path):
+    payload = {"innings": []}
+    (tmp_path / "123.json").write_text(json.dumps(payload))
+    fetcher, requests, _ = scheduler(
+        [httpx.ConnectError("down")], retries=1, rng=Jitter()
+    )
+    assert main.fetch_innings(fetcher, "123", ttl=0, folder=tmp_path) == payload
+    assert len(requests) == 2
+    assert main.fetch_innings(fetcher, "456", ttl=0, folder=tmp_path) == {}
@@ -0,0 +1,71 @@
+import sqlite3
+
+from player_registry import PlayerRegistry
+from projection import Lineup
+from results_db import SCHEMA, load_registry, record_game
+from results_table import ResultsTable
+
+
+def scored(registry, game, lines):
+    # A game's table as main builds it, from (scorecard name, id, points)
+    points = {registry.key({"id": i, "name": name}): p for name, i, p in lines}
+    return ResultsTable(
+        game,
+        registry.named(points),
+        {},
+        names=registry.spellings(points),
+    )
+
+
+def database(tmp_path, aliases=""):
+    registry = PlayerRegistry()
+    db = sqlite3.connect(":memory:")
+    db.executescript(SCHEMA)
+    record_game(db, scored(registry, 1, [("Vaibhav Suryavanshi", 1632168, 56)]))
+    record_game(
+        db,
+        scored(
+            registry,
+            2,
+            [("Vaibhav Sooryavanshi", 1632168, 26), ("Varun Chakaravarthy", 7, 40)],
+        ),
+    )
+    (tmp_path / "utils").mkdir()
+    (tmp_path / "utils" / "aliases.csv").write_text(aliases)
+    return db
+
+
+def test_names_scoring_met_match_the_scored_player(tmp_path):
+    db = database(tmp_path)
+    registry = load_registry(db, tmp_path)
+    key = registry.find("Vaibhav Suryavanshi")
+    assert registry.find("Vaibhav Sooryavanshi") == key
+    assert registry.find(" vaibhav  SOORYAVANSHI (WK)") == key
+    assert registry.name(key) == "Vaibhav Suryavanshi"
+    assert registry.find("Vaibhav Arora") is None
+
+
+def test_alias_table_covers_other_spellings(tmp_path):
+    db = database(tmp_path, "Varun Chakravarthy,7\nV Suryavanshi,Vaibhav Suryavanshi\n")
+    registry = load_registry(db, tmp_path)
+    assert registry.find("Varun Chakravarthy") == registry.find("Varun Chakaravarthy")
+    assert registry.find("V Suryavanshi") == registry.find("Vaibhav Sooryavanshi")
+
+
+def test_rescoring_a_game_replaces_its_names(tmp_path):
+    db = database(tmp_path)
+    record_game(db, scored(PlayerRegistry(), 2, [("Varun Chakaravarthy", 7, 40)]))
+    assert load_registry(db, tmp_path).find("Vaibhav Sooryavanshi") is None
+
+
+def test_lineup_matches_roster_spellings(tmp_path):
+    registry = load_registry(database(tmp_path), tmp_path)
+    players = {registry.find("Vaibhav Suryavanshi"): 0}
+    entry = {"participant": "A XI", "name": "Vaibhav Sooryavanshi", "wk": False}
+    roster = {
+        0: [dict(entry, role="batsmen")],
+        1: [dict(entry, name="Vaibhav Arora", role="bowlers")],
+    }
+    lineup = Lineup(roster, players, ["A XI"], 1, registry)
+    assert lineup.bat[0, 0] == 0
+    assert lineup.bowl[0, 0] == 1  # Never scored, so never plays
@@ -0,0 +1,45 @@
+from main import SheetsExporter
+from results_table import ResultsTable
+from sheets_publisher import LocalSpreadsheet, SheetsPublisher
+from standings_ledger import StandingsLedger
+
+
+def results(game, points):
+    best_xis = {
+        participant: [(f"{participant} {n}", total // 11) for n in range(11)]
+        for participant, total in points.items()
+    }
+    return ResultsTable(game, {"Player": 1}, best_xis)
+
+
+def publish(spreadsheet, ledger, tables):
+    # One run: every game's worksheet queued, then a single flush
+    doc = SheetsPublisher(spreadsheet)
+    for table in tables:
+        ledger.record(table.game, table.standings)
+        SheetsExporter(doc, ledger).export(table)
+    doc.flush()
+
+
+def test_one_get_and_one_batch_update_per_run():
+    spreadsheet = LocalSpreadsheet(["GAME 1 TABLE", "GAME 2 TABLE", "GAME 3 TABLE"])
+    ledger = StandingsLedger(None)
+    tables = [
+        results(1, {"A XI": 110, "B XI": 220}),
+        results(2, {"A XI": 330, "B XI": 0}),
+    ]
+    publish(spreadsheet, ledger, tables)
+    assert spreadsheet.calls == ["get", "batchUpdate"]
+    grid = spreadsheet.sheets[1]["grid"]
+    assert [grid[(1, c)] for c in range(5)] == ["1", "A XI", "110", "330", "440"]
+    assert grid[(14, 1)] == "A XI"
+
+    publish(spreadsheet, ledger, [results(3, {"A XI": 11, "B XI": 0})])
+    assert spreadsheet.calls == ["get", "batchUpdate"] * 2
+    assert spreadsheet.sheets[2]["grid"][(0, 4)] == "Game 3"
+
+
+def test_nothing_queued_sends_nothing():
+    spreadsheet = LocalSpreadsheet(["GAME 1 TABLE"])
+    assert SheetsPublisher(spreadsheet).flush() is None
+    assert spreadsheet.calls == ["get"]
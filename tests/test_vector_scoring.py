@@ -0,0 +1,32 @@
+import contextlib
+import io
+
+import main
+from leaderboard import Leaderboard
+from standings_ledger import StandingsLedger
+
+GAMES = range(1, 16)
+
+
+def score(season=None):
+    tables = {}
+    for game in GAMES:
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, tables[game] = main.main(
+                None,
+                game,
+                Leaderboard(),
+                update_sheet=False,
+                season=season,
+                ledger=StandingsLedger(None),
+                formats=(),
+            )
+    return {game: table.to_json() for game, table in tables.items()}
+
+
+def test_vector_tables_match_scalar(monkeypatch):
+    monkeypatch.setattr(main, "OFFLINE", True)
+    scalar = score()
+    vector = score(main.score_games(GAMES))
+    for game in GAMES:
+        assert vector[game] == scalar[game], f"game {game}"